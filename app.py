@@ -48,10 +48,30 @@ app.register_blueprint(predict_bp, url_prefix='/api')
 from routes.sports import sports_bp
 app.register_blueprint(sports_bp, url_prefix='/sports')
 
+# Keep scoreboards warm in the background on long-running servers.
+# Serverless platforms freeze the process between requests, so it stays off there.
+from services.sports_service import SportsService
+if os.getenv("SCOREBOARD_REFRESH", "1") == "1" and not (os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME")):
+    SportsService.enable_background_refresh()
+
+# Same for the grading worker; without it check-results grades in bounded inline batches
+from routes.sports import grading_worker
+if os.getenv("GRADING_WORKER", "1") == "1" and not (os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME")):
+    grading_worker.start()
+
+# Page views are counted in memory and flushed periodically instead of one UPDATE per view
+from services.database_service import DatabaseService
+if not (os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME")):
+    DatabaseService.enable_visit_buffer()
+
+# Optional matchday pre-generation (PREGEN_INTERVAL seconds, off by default)
+from routes.sports import pregeneration_service
+if not (os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME")):
+    pregeneration_service.start()
+
 @app.route('/')
 def index():
     # Redirect or render the sports main page as the home page
-    from services.sports_service import SportsService
     sports_service = SportsService()
     league = request.args.get('league', 'all')
     games_data = sports_service.get_games(league_code=league, type='upcoming')
@@ -60,11 +80,14 @@ def index():
     if isinstance(games_data, dict):
         live_games = games_data.get('live', [])
         upcoming_games = games_data.get('upcoming', [])
+        missing_leagues = games_data.get('missing_leagues', [])
     else:
         live_games = []
         upcoming_games = games_data
+        missing_leagues = []
 
-    return render_template('sports_index.html', live_games=live_games, upcoming_games=upcoming_games, active_league=league)
+    return render_template('sports_index.html', live_games=live_games, upcoming_games=upcoming_games,
+                           missing_leagues=missing_leagues, active_league=league)
 
 @app.route('/test_api')
 def test_api():
@@ -0,0 +1,170 @@
+"""
+Local stand-ins for the ESPN site API and the Gemini REST API.
+
+    python benchmarks/fake_upstreams.py --espn-port 8801 --gemini-port 8802 --latency 0.15 --error-rate 0.02
+
+Point the app at them with ESPN_BASE_URL=http://127.0.0.1:8801/apis/site/v2/sports
+and GEMINI_BASE_URL=http://127.0.0.1:8802 (plus any GEMINI_API_KEY).
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import payloads  # noqa: E402
+
+ESPN_PATH_RE = re.compile(r"^/apis/site/v2/sports/[^/]+/([^/]+)/(scoreboard|summary)$")
+GEMINI_PATH_RE = re.compile(r"^/[^/]+/models/([^/:]+):(generateContent|streamGenerateContent)$")
+
+
+class UpstreamConfig:
+    def __init__(self, latency=0.1, jitter=0.05, error_rate=0.0, events_per_day=4, llm_latency=1.5, stream_chunks=8):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.events_per_day = events_per_day
+        self.llm_latency = llm_latency
+        self.stream_chunks = stream_chunks
+        self.requests = {"scoreboard": 0, "summary": 0, "generate": 0, "stream": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def count(self, key):
+        with self._lock:
+            self.requests[key] += 1
+
+    def delay(self, base):
+        time.sleep(max(0.0, base + random.uniform(-self.jitter, self.jitter)))
+
+    def should_fail(self):
+        if self.error_rate and random.random() < self.error_rate:
+            self.count("errors")
+            return True
+        return False
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body, content_type="application/json"):
+        raw = json.dumps(body).encode() if not isinstance(body, bytes) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+class ESPNHandler(_Handler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        match = ESPN_PATH_RE.match(url.path)
+        if not match:
+            return self._send_json(404, {"error": "not found"})
+        league, kind = match.groups()
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        self.config.count(kind)
+        self.config.delay(self.config.latency)
+        if self.config.should_fail():
+            return self._send_json(503, {"error": "upstream unavailable"})
+
+        if kind == "scoreboard":
+            body = payloads.scoreboard(league, params.get("dates"), self.config.events_per_day)
+        else:
+            body = payloads.summary(params.get("event", "0"))
+        self._send_json(200, body)
+
+
+class GeminiHandler(_Handler):
+    def do_POST(self):
+        url = urlparse(self.path)
+        match = GEMINI_PATH_RE.match(url.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not match:
+            return self._send_json(404, {"error": {"code": 404, "message": "not found"}})
+
+        prompt = " ".join(
+            part.get("text", "") for content in request.get("contents", []) for part in content.get("parts", [])
+        )
+        text = payloads.gemini_text_for_prompt(prompt)
+
+        if match.group(2) == "generateContent":
+            self.config.count("generate")
+            self.config.delay(self.config.llm_latency)
+            if self.config.should_fail():
+                return self._send_json(429, {"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}})
+            return self._send_json(200, payloads.gemini_response(text))
+
+        # Server-sent events, the first chunk arrives after a fraction of the full latency
+        self.config.count("stream")
+        if self.config.should_fail():
+            return self._send_json(429, {"error": {"code": 429, "message": "Resource exhausted", "status": "RESOURCE_EXHAUSTED"}})
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        size = max(1, len(text) // self.config.stream_chunks + 1)
+        for i in range(0, len(text), size):
+            self.config.delay(self.config.llm_latency / self.config.stream_chunks)
+            chunk = json.dumps(payloads.gemini_response(text[i:i + size]))
+            self.wfile.write(f"data: {chunk}\r\n\r\n".encode())
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def _serve(handler_cls, config, port):
+    handler = type(handler_cls.__name__, (handler_cls,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start(config=None, espn_port=0, gemini_port=0):
+    """Starts both fakes in background threads. Returns (config, espn_server, gemini_server)."""
+    config = config or UpstreamConfig()
+    return config, _serve(ESPNHandler, config, espn_port), _serve(GeminiHandler, config, gemini_port)
+
+
+def env_for(espn_server, gemini_server):
+    return {
+        "ESPN_BASE_URL": f"http://127.0.0.1:{espn_server.server_port}/apis/site/v2/sports",
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{gemini_server.server_port}",
+        "GEMINI_API_KEY": "fake-key-for-local-benchmarks",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--espn-port", type=int, default=8801)
+    parser.add_argument("--gemini-port", type=int, default=8802)
+    parser.add_argument("--latency", type=float, default=0.1, help="ESPN response latency (s)")
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="Gemini full generation latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503/429")
+    parser.add_argument("--events-per-day", type=int, default=4)
+    args = parser.parse_args()
+
+    cfg, espn, gemini = start(
+        UpstreamConfig(latency=args.latency, error_rate=args.error_rate,
+                       events_per_day=args.events_per_day, llm_latency=args.llm_latency),
+        args.espn_port, args.gemini_port,
+    )
+    for key, value in env_for(espn, gemini).items():
+        print(f"export {key}={value}")
+    try:
+        while True:
+            time.sleep(5)
+    except KeyboardInterrupt:
+        print(cfg.requests)
@@ -0,0 +1,235 @@
+"""
+Offline load test: runs the Flask app against local ESPN/Gemini stand-ins and
+drives its busiest routes at fixed concurrency levels.
+
+    python benchmarks/loadtest.py --concurrency 1,8,32 --requests 200
+    python benchmarks/loadtest.py --json results.json
+    python benchmarks/loadtest.py --baseline results.json --tolerance 0.25   # exit 1 on regression
+
+Reports p50/p95/p99 latency (ms) and requests per second per scenario. The app
+is served by werkzeug's threaded server in-process, so absolute numbers are
+lower than under gunicorn; compare runs against each other, not against prod.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import fake_upstreams  # noqa: E402
+import payloads  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.base_url = None
+        self.fixtures = []
+
+    def setup(self):
+        cfg = fake_upstreams.UpstreamConfig(
+            latency=self.args.espn_latency, error_rate=self.args.error_rate,
+            llm_latency=self.args.llm_latency, events_per_day=self.args.events_per_day,
+        )
+        self.upstreams, espn, gemini = fake_upstreams.start(cfg)
+
+        # Everything the services read at import time must be set before the app is imported
+        os.environ.update(fake_upstreams.env_for(espn, gemini))
+        os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="safepick-loadtest-"), "loadtest.db")
+        os.environ.pop("DATABASE_URL", None)
+        if self.args.no_refresher:
+            os.environ["SCOREBOARD_REFRESH"] = "0"
+
+        from werkzeug.serving import make_server
+        import app as flask_app
+
+        # Per-request access logs would drown the results table
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+        self.server = make_server("127.0.0.1", 0, flask_app.app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+        # Upcoming fixtures to predict and past fixtures to grade
+        now = datetime.utcnow()
+        for offset in range(1, 4):
+            day = (now + timedelta(days=offset)).strftime("%Y%m%d")
+            for n in range(self.args.events_per_day):
+                event = payloads.make_event("eng.1", day, n, now)
+                comps = event["competitions"][0]["competitors"]
+                self.fixtures.append((event["id"], comps[0]["team"]["displayName"], comps[1]["team"]["displayName"]))
+        self._seed_pending(now)
+
+    def _seed_pending(self, now):
+        from routes.sports import db_service, sports_service
+        # Loading epl history fills the event index so grading can batch
+        sports_service.get_games(league_code="epl", type="past")
+        count = 0
+        for offset in range(5, 60):
+            day = (now - timedelta(days=offset)).strftime("%Y%m%d")
+            for n in range(self.args.events_per_day):
+                if count >= self.args.pending:
+                    return
+                event = payloads.make_event("eng.1", day, n, now)
+                db_service.save_prediction(
+                    {"id": event["id"], "home_team": "H", "away_team": "A", "league": "epl", "device": "loadtest"},
+                    payloads.prediction("H", "A", seed=event["id"]),
+                )
+                count += 1
+
+    # Scenarios: each takes a requests.Session and returns the response
+    def index(self, session):
+        return session.get(f"{self.base_url}/sports/?league=all")
+
+    def history(self, session):
+        return session.get(f"{self.base_url}/sports/history?league=all")
+
+    def predict(self, session):
+        event_id, home, away = random.choice(self.fixtures)
+        return session.post(f"{self.base_url}/sports/predict", json={
+            "event_id": event_id, "home_team": home, "away_team": away, "league": "epl", "device": "loadtest"
+        })
+
+    def check_results(self, session):
+        return session.post(f"{self.base_url}/sports/stats/check-results")
+
+    def run_level(self, scenario, concurrency, total):
+        import requests
+
+        fn = getattr(self, scenario)
+        latencies, errors = [], 0
+        lock = threading.Lock()
+        remaining = [total]
+
+        def worker():
+            nonlocal errors
+            session = requests.Session()
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                started = time.perf_counter()
+                try:
+                    ok = fn(session).status_code < 400
+                except Exception:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed)
+                    errors += 0 if ok else 1
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            "scenario": scenario,
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": errors,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "rps": round(len(latencies) / wall, 1) if wall else 0,
+        }
+
+    def wait_for_grading(self, timeout=300):
+        """check-results only enqueues; time how long the active (or a new) job takes to finish."""
+        import requests
+        started = time.perf_counter()
+        # One POST returns the job still queued/running from the scenario, then poll only that job
+        job = requests.post(f"{self.base_url}/sports/stats/check-results").json()
+        job_url = f"{self.base_url}/sports/stats/check-results/{job.get('job_id')}"
+        while job.get("status") in ("queued", "running"):
+            if time.perf_counter() - started >= timeout:
+                return dict(job, status="timeout")
+            time.sleep(0.5)
+            # Without a grading worker the job only advances when asked to continue
+            job = requests.get(job_url).json() if job.get("worker") else requests.post(f"{job_url}/continue").json()
+        return job
+
+
+def compare(results, baseline, tolerance):
+    base = {f"{r['scenario']}@{r['concurrency']}": r for r in baseline}
+    regressions = []
+    for r in results:
+        ref = base.get(f"{r['scenario']}@{r['concurrency']}")
+        if not ref:
+            continue
+        if ref["p95_ms"] and r["p95_ms"] > ref["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}@{r['concurrency']}: p95 {r['p95_ms']}ms > baseline {ref['p95_ms']}ms")
+        if ref["rps"] and r["rps"] < ref["rps"] * (1 - tolerance):
+            regressions.append(f"{r['scenario']}@{r['concurrency']}: {r['rps']} rps < baseline {ref['rps']} rps")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="index,history,predict,check_results")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario and level")
+    parser.add_argument("--espn-latency", type=float, default=0.1)
+    parser.add_argument("--llm-latency", type=float, default=1.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--events-per-day", type=int, default=4)
+    parser.add_argument("--pending", type=int, default=500, help="pending predictions seeded for grading")
+    parser.add_argument("--no-refresher", action="store_true", help="disable the background scoreboard refresher")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json output")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    test = LoadTest(args)
+    test.setup()
+
+    results = []
+    print(f"{'scenario':<15}{'conc':>6}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}")
+    for scenario in args.scenarios.split(","):
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            r = test.run_level(scenario.strip(), concurrency, args.requests)
+            results.append(r)
+            print(f"{r['scenario']:<15}{r['concurrency']:>6}{r['requests']:>7}{r['errors']:>6}"
+                  f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['rps']:>9}")
+        if scenario.strip() == "check_results":
+            job = test.wait_for_grading()
+            print(f"grading job: {job}")
+
+    print(f"upstream requests: {test.upstreams.requests}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
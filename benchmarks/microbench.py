@@ -0,0 +1,252 @@
+"""
+CPU microbenchmarks for the per-request pure-Python hot paths:
+
+    _process_event       scoreboard events -> game dicts (90 days x every league)
+    stream_events        the same from raw response bytes, decoded one event at a time
+    get_games_upcoming   sort + live/upcoming split over the aggregated games
+    get_games_past       reverse date sort over the aggregated history
+    game_stats           summary payload -> flattened home/away stat rows
+    grade_prediction     grading a batch of structured predictions
+
+    python benchmarks/microbench.py                       # exit 1 on regression vs the committed baseline
+    python benchmarks/microbench.py --update-baseline     # re-record microbench_baseline.json
+    python benchmarks/microbench.py --baseline micro.json --tolerance 0.3
+    python benchmarks/microbench.py --no-baseline --json micro.json
+    python benchmarks/microbench.py --scoreboard recorded.json              # recorded ESPN payload
+
+Timings report the median and the fastest of --rounds rounds; peak allocation is
+measured in a separate tracemalloc pass so tracing does not skew the timings. No
+network or database is touched.
+
+By default every run is compared against benchmarks/microbench_baseline.json and
+exits 1 on a regression. Absolute milliseconds swing by 2x on a busy machine, so
+timings are compared as "relative": each round divided by a fixed calibration
+workload timed right before it, median over the rounds. That ratio stays within
+~5% between runs, and --tolerance (25%) leaves room for that. Peak allocation is
+deterministic and gets --mem-tolerance (10%). A flagged case is re-measured once
+before it counts. Re-record the baseline with --update-baseline when a case
+changes on purpose; cases run with different --days/--events-per-day are skipped.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(HERE, "microbench_baseline.json")
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import payloads  # noqa: E402
+from services.sports_service import SportsService  # noqa: E402
+from services import json_stream  # noqa: E402
+from services.grading_service import grade_prediction  # noqa: E402
+
+
+class OfflineSportsService(SportsService):
+    """SportsService fed from in-memory payloads instead of ESPN."""
+
+    def __init__(self, games_by_league=None, summary=None):
+        super().__init__(db_service=None)
+        self.games_by_league = games_by_league or {}
+        self.summary = summary
+
+    def _fetch_league_games(self, league_code, type, dates):
+        return list(self.games_by_league.get(league_code, []))
+
+    def _fetch_from_url(self, url, params=None, use_cache=True, raise_errors=False):
+        return self.summary
+
+    def _index_event(self, event_id, league_code, date):
+        # Keep the shared event index out of the measurement
+        pass
+
+
+# Synthetic payloads are seeded per calendar day, so a fixed clock keeps the inputs
+# (and item counts) identical from one day to the next and comparable to the baseline
+BENCH_NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def build_inputs(args):
+    now = BENCH_NOW
+    if args.scoreboard:
+        with open(args.scoreboard) as f:
+            recorded = json.load(f)
+        scoreboards = {code: recorded for code in SportsService.LEAGUES_CONFIG}
+    else:
+        dates = f"{(now - timedelta(days=args.days)).strftime('%Y%m%d')}-{(now + timedelta(days=7)).strftime('%Y%m%d')}"
+        scoreboards = {
+            code: payloads.scoreboard(config['slug'], dates, args.events_per_day, now)
+            for code, config in SportsService.LEAGUES_CONFIG.items()
+        }
+
+    service = OfflineSportsService()
+    games_by_league = {code: service._games_from_payload(data, code) for code, data in scoreboards.items()}
+
+    graded = []
+    for games in games_by_league.values():
+        for game in games:
+            h, a = int(game['home_team']['score'] or 0), int(game['away_team']['score'] or 0)
+            winner = 'home' if h > a else 'away' if a > h else 'draw'
+            struc = payloads.prediction(game['home_team']['name'], game['away_team']['name'], game['id'])['structured_prediction']
+            graded.append((struc, {'home_score': h, 'away_score': a, 'winner': winner, 'status': 'post'}))
+
+    return scoreboards, games_by_league, graded
+
+
+def make_cases(scoreboards, games_by_league, graded):
+    service = OfflineSportsService(games_by_league, payloads.summary("401000001"))
+    events = [(event, code) for code, data in scoreboards.items() for event in data.get('events', [])]
+
+    # Results are kept so the peak includes what the request would hold on to
+    def process_events():
+        return [service._process_event(event, code) for event, code in events]
+
+    # What a streamed history backfill does with a large response body (min_bytes=0 forces
+    # the incremental decoder even though the synthetic bodies are small)
+    raw = [(json.dumps(data).encode(), code) for code, data in scoreboards.items()]
+
+    def stream_events():
+        games = []
+        for body, code in raw:
+            chunks = (body[i:i + json_stream.CHUNK_SIZE] for i in range(0, len(body), json_stream.CHUNK_SIZE))
+            games.extend(service._process_event(event, code) for event in json_stream.iter_array(chunks, 'events', min_bytes=0))
+        return games
+
+    def game_stats():
+        return [service.get_game_stats("401000001", "epl") for _ in range(200)]
+
+    def grade_all():
+        return [grade_prediction(struc, result) for struc, result in graded]
+
+    return [
+        ("_process_event", len(events), process_events),
+        ("stream_events", len(events), stream_events),
+        ("get_games_upcoming", sum(len(g) for g in games_by_league.values()),
+         lambda: service.get_games('all', 'upcoming')),
+        ("get_games_past", sum(len(g) for g in games_by_league.values()),
+         lambda: service.get_games('all', 'past')),
+        ("game_stats", 200, game_stats),
+        ("grade_prediction", len(graded), grade_all),
+    ]
+
+
+def calibration():
+    """Fixed pure-Python workload (dict build + sort) timed next to every case."""
+    d = {str(i): (i * 7919) % 20011 for i in range(20000)}
+    return sorted(d.items(), key=lambda kv: kv[1])
+
+
+def measure(name, items, fn, rounds):
+    fn()  # warm up
+    calibration()
+    timings = []
+    calibrations = []
+    for _ in range(rounds):
+        # Interleaved so a slow stretch of the machine hits both numbers alike
+        started = time.perf_counter()
+        calibration()
+        calibrations.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    median = statistics.median(timings)
+    fastest = min(timings)
+    return {
+        "case": name,
+        "items": items,
+        "median_ms": round(median * 1000, 3),
+        "min_ms": round(fastest * 1000, 3),
+        "us_per_item": round(fastest * 1e6 / items, 3) if items else 0,
+        # Median of each round over the calibration run right before it; what the baseline check compares
+        "relative": round(statistics.median(t / c for t, c in zip(timings, calibrations)), 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance, mem_tolerance=None):
+    base = {r["case"]: r for r in baseline}
+    regressions = []
+    for r in results:
+        ref = base.get(r["case"])
+        if not ref:
+            continue
+        if ref["items"] != r["items"]:
+            print(f"skipping {r['case']}: baseline was recorded with {ref['items']} items, this run has {r['items']}")
+            continue
+        if ref.get("relative") and r["relative"] > ref["relative"] * (1 + tolerance):
+            regressions.append((r["case"], f"{r['case']}: {r['relative']}x calibration > baseline {ref['relative']}x ({r['min_ms']}ms vs {ref['min_ms']}ms)"))
+        if ref["peak_kb"] and r["peak_kb"] > ref["peak_kb"] * (1 + (tolerance if mem_tolerance is None else mem_tolerance)):
+            regressions.append((r["case"], f"{r['case']}: peak {r['peak_kb']}KB > baseline {ref['peak_kb']}KB"))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90, help="days of history per league")
+    parser.add_argument("--events-per-day", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=15)
+    parser.add_argument("--only", help="comma separated case names")
+    parser.add_argument("--scoreboard", help="recorded ESPN scoreboard JSON used for every league")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="compare against a previous --json output")
+    parser.add_argument("--no-baseline", action="store_true", help="skip the baseline comparison")
+    parser.add_argument("--update-baseline", action="store_true", help="write results to the committed baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed growth of the relative timing")
+    parser.add_argument("--mem-tolerance", type=float, default=0.1, help="allowed growth of peak allocation")
+    args = parser.parse_args()
+
+    cases = make_cases(*build_inputs(args))
+    if args.only:
+        wanted = set(args.only.split(","))
+        cases = [c for c in cases if c[0] in wanted]
+
+    results = []
+    print(f"{'case':<22}{'items':>8}{'median ms':>12}{'min ms':>10}{'us/item':>10}{'relative':>10}{'peak KB':>11}")
+    for name, items, fn in cases:
+        r = measure(name, items, fn, args.rounds)
+        results.append(r)
+        print(f"{r['case']:<22}{r['items']:>8}{r['median_ms']:>12}{r['min_ms']:>10}{r['us_per_item']:>10}{r['relative']:>10}{r['peak_kb']:>11}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return
+
+    if args.baseline and not args.no_baseline:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}, record one with --update-baseline")
+            sys.exit(1)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.mem_tolerance)
+        if regressions:
+            # A noisy stretch can slow every case at once; flagged cases must regress twice to fail
+            flagged = {case for case, _ in regressions}
+            print(f"Re-measuring {', '.join(sorted(flagged))}")
+            time.sleep(1)
+            retry = [measure(name, items, fn, args.rounds * 3) for name, items, fn in cases if name in flagged]
+            regressions = compare(retry, baseline, args.tolerance, args.mem_tolerance)
+        if regressions:
+            print("REGRESSIONS:\n  " + "\n  ".join(message for _, message in regressions))
+            sys.exit(1)
+        print("No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Deterministic synthetic ESPN and Gemini payloads shared by the load test and
+the microbenchmarks. Shapes follow the fields SportsService/GeminiService read.
+"""
+import hashlib
+import json
+import random
+from datetime import datetime, timedelta
+
+TEAMS = [
+    "Arsenal", "Aston Villa", "Chelsea", "Liverpool", "Manchester City", "Manchester United",
+    "Newcastle United", "Tottenham Hotspur", "Real Madrid", "Barcelona", "Atletico Madrid",
+    "Bayern Munich", "Borussia Dortmund", "Inter Milan", "AC Milan", "Juventus", "Napoli",
+    "Paris Saint-Germain", "Marseille", "Benfica", "Porto", "Ajax", "Celtic", "Al Hilal",
+]
+
+
+def _rng(*parts):
+    seed = int(hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()[:8], 16)
+    return random.Random(seed)
+
+
+def _num(value, mod):
+    # Stable across processes, unlike hash()
+    return int(hashlib.md5(str(value).encode()).hexdigest()[:8], 16) % mod
+
+
+def event_id_for(league, day, n):
+    return str(400000 + (int(hashlib.md5(f"{league}|{day}|{n}".encode()).hexdigest()[:7], 16) % 9000000))
+
+
+def make_event(league, day, n, now=None):
+    """One scoreboard event; state follows the kickoff time relative to now."""
+    now = now or datetime.utcnow()
+    rng = _rng(league, day, n)
+    kickoff = datetime.strptime(day, "%Y%m%d") + timedelta(hours=12 + 2 * n, minutes=rng.choice([0, 30]))
+    if kickoff > now:
+        state, detail = "pre", kickoff.strftime("%a, %B %d at %I:%M %p")
+    elif kickoff + timedelta(hours=2) > now:
+        state, detail = "in", f"{rng.randint(1, 90)}'"
+    else:
+        state, detail = "post", "FT"
+
+    home, away = rng.sample(TEAMS, 2)
+    h_score, a_score = (rng.randint(0, 4), rng.randint(0, 3)) if state != "pre" else (0, 0)
+
+    def competitor(name, side, score, other):
+        return {
+            "id": str(_num(name, 100000)),
+            "homeAway": side,
+            "score": str(score),
+            "winner": state == "post" and score > other,
+            "team": {
+                "id": str(_num(name, 100000)),
+                "displayName": name,
+                "logo": f"https://a.espncdn.com/i/teamlogos/soccer/500/{_num(name, 1000)}.png",
+            },
+        }
+
+    return {
+        "id": event_id_for(league, day, n),
+        "date": kickoff.strftime("%Y-%m-%dT%H:%MZ"),
+        "name": f"{away} at {home}",
+        "status": {"type": {"state": state, "shortDetail": detail, "detail": detail}},
+        "competitions": [{
+            "competitors": [
+                competitor(home, "home", h_score, a_score),
+                competitor(away, "away", a_score, h_score),
+            ]
+        }],
+    }
+
+
+def iter_days(dates):
+    """Expands an ESPN 'dates' param (YYYYMMDD or YYYYMMDD-YYYYMMDD) into days."""
+    start, _, end = dates.partition("-")
+    day = datetime.strptime(start, "%Y%m%d")
+    last = datetime.strptime(end or start, "%Y%m%d")
+    while day <= last:
+        yield day.strftime("%Y%m%d")
+        day += timedelta(days=1)
+
+
+def scoreboard(league, dates=None, events_per_day=4, now=None):
+    now = now or datetime.utcnow()
+    dates = dates or now.strftime("%Y%m%d")
+    events = []
+    for day in iter_days(dates):
+        # Not every league plays every day
+        count = _rng(league, day).randint(0, events_per_day)
+        events.extend(make_event(league, day, n, now) for n in range(count))
+    return {"leagues": [{"abbreviation": league}], "events": events}
+
+
+def summary(event_id, now=None):
+    """Summary payload for an event id, consistent across calls."""
+    rng = _rng("summary", event_id)
+    home, away = rng.sample(TEAMS, 2)
+    h_score, a_score = rng.randint(0, 4), rng.randint(0, 3)
+    state = "post"
+    competitors = [
+        {"id": "1", "homeAway": "home", "score": str(h_score), "winner": h_score > a_score,
+         "team": {"id": "1", "displayName": home, "logo": ""}},
+        {"id": "2", "homeAway": "away", "score": str(a_score), "winner": a_score > h_score,
+         "team": {"id": "2", "displayName": away, "logo": ""}},
+    ]
+    labels = ["Possession", "Shots", "Shots on Target", "Corner Kicks", "Fouls", "Yellow Cards",
+              "Red Cards", "Offsides", "Saves", "Passes", "Pass Completion %", "Tackles"]
+    return {
+        "header": {"competitions": [{
+            "status": {"type": {"state": state, "detail": "FT"}},
+            "competitors": competitors,
+        }]},
+        "boxscore": {"teams": [
+            {"team": {"id": c["id"]}, "statistics": [
+                {"label": label, "displayValue": str(rng.randint(0, 60))} for label in labels
+            ]} for c in competitors
+        ]},
+    }
+
+
+def prediction(home="Arsenal", away="Aston Villa", seed=0):
+    rng = _rng("prediction", home, away, seed)
+    market = rng.choice(["over_under", "double_chance", "moneyline"])
+    struc = {
+        "over_under": {"market_type": "over_under", "selection": rng.choice(["Over", "Under"]), "line": rng.choice([1.5, 2.5, 3.5])},
+        "double_chance": {"market_type": "double_chance", "selection": rng.choice(["1X", "X2", "12"])},
+        "moneyline": {"market_type": "moneyline", "selection": rng.choice(["home", "away", "draw"])},
+    }[market]
+    struc["confidence"] = rng.choice(["low", "medium", "high"])
+    return {
+        "match": f"{home} vs {away}",
+        "best_pick": "Over 1.5 Goals",
+        "reasoning": [
+            f"Reputation: {home} are attack-oriented at home",
+            "League pattern: This league often produces multiple-goal matches",
+            f"Tactical note: {away} play positively",
+        ],
+        "structured_prediction": struc,
+        "safer_alternative": "Double Chance: Home or Draw (1X)",
+        "disclaimer": "This is AI-generated analysis based on historical patterns.",
+    }
+
+
+def gemini_response(text):
+    return {
+        "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP", "index": 0}],
+        "usageMetadata": {"promptTokenCount": 600, "candidatesTokenCount": 180, "totalTokenCount": 780},
+    }
+
+
+def gemini_text_for_prompt(prompt):
+    """Answers single and batch prediction prompts the way the real model is asked to."""
+    if "one match per line" in prompt:
+        items = []
+        for line in prompt.splitlines():
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) == 3 and " vs " in parts[1]:
+                home, away = parts[1].split(" vs ", 1)
+                item = prediction(home, away)
+                item["event_id"] = parts[0]
+                items.append(item)
+        return json.dumps(items)
+
+    home, away = "Home", "Away"
+    for line in prompt.splitlines():
+        if line.startswith("Match:") and " vs " in line:
+            home, away = line[len("Match:"):].strip().split(" vs ", 1)
+            break
+    return json.dumps(prediction(home, away))
@@ -9,7 +9,7 @@ gemini_service = GeminiService()
 def predict_match():
     """
     Endpoint to get match prediction.
-    Expected JSON: {"home": "Team A", "away": "Team B", "league": "League Name"}
+    Expected JSON: {"home": "Team A", "away": "Team B", "league": "League Name", "event_id": "optional"}
     """
     data = request.json
     
@@ -20,7 +20,7 @@ def predict_match():
     away = data['away']
     league = data['league']
 
-    raw_prediction = gemini_service.get_prediction(home, away, league)
+    raw_prediction = gemini_service.get_prediction(home, away, league, event_id=data.get('event_id'))
     formatted_response = format_prediction_response(raw_prediction, home, away)
 
     return jsonify(formatted_response)
@@ -1,13 +1,21 @@
 
-from flask import Blueprint, render_template, request, jsonify
+import json
+from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context
 from services.sports_service import SportsService
 from services.gemini_service import GeminiService
 from services.database_service import DatabaseService
+from services.grading_service import GradingService, GradingWorker
+from services.pregeneration_service import PregenerationService
+from services.prediction_jobs import PredictionJobManager
 
 sports_bp = Blueprint('sports', __name__)
-sports_service = SportsService()
-gemini_service = GeminiService()
 db_service = DatabaseService()
+sports_service = SportsService(db_service=db_service)
+gemini_service = GeminiService(db_service=db_service)
+grading_service = GradingService(sports_service, db_service)
+grading_worker = GradingWorker(grading_service)
+pregeneration_service = PregenerationService(sports_service, gemini_service)
+prediction_jobs = PredictionJobManager(gemini_service, db_service)
 
 @sports_bp.route('/')
 def index():
@@ -21,20 +29,24 @@ def index():
     if isinstance(games_data, dict):
         live_games = games_data.get('live', [])
         upcoming_games = games_data.get('upcoming', [])
+        missing_leagues = games_data.get('missing_leagues', [])
     else:
         live_games = []
         upcoming_games = games_data
+        missing_leagues = []
         
     return render_template('sports_index.html', 
                          live_games=live_games, 
                          upcoming_games=upcoming_games, 
+                         missing_leagues=missing_leagues,
                          active_league=league)
 
 @sports_bp.route('/history')
 def history():
     league = request.args.get('league', 'all')
     games = sports_service.get_games(league_code=league, type='past')
-    return render_template('sports_history.html', games=games, active_league=league)
+    return render_template('sports_history.html', games=games, active_league=league,
+                           missing_leagues=getattr(games, 'missing_leagues', []))
 
 @sports_bp.route('/result/update', methods=['POST'])
 def update_result():
@@ -49,9 +61,21 @@ def update_result():
 @sports_bp.route('/stats')
 def stats():
     stats_data = db_service.get_stats()
-    # Fetch pending/graded predictions separately if needed, for now just recent
-    recent_predictions = db_service.get_recent_predictions(limit=50) 
-    return render_template('stats.html', stats=stats_data, predictions=recent_predictions)
+    # First keyset page; further pages come from /stats/predictions
+    recent_predictions, next_cursor = db_service.get_predictions_page(limit=50)
+    return render_template('stats.html', stats=stats_data, predictions=recent_predictions, next_cursor=next_cursor)
+
+@sports_bp.route('/stats/predictions')
+def stats_predictions():
+    limit = request.args.get('limit', 50, type=int)
+    predictions, next_cursor = db_service.get_predictions_page(limit=limit, cursor=request.args.get('cursor'))
+    if request.args.get('format') == 'html':
+        # Rendered rows for the stats page "Load more" button
+        response = Response(render_template('includes/prediction_rows.html', predictions=predictions))
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+    return jsonify({"predictions": predictions, "next_cursor": next_cursor})
 
 
 @sports_bp.route('/stats/reset', methods=['POST'])
@@ -60,103 +84,55 @@ def reset_stats():
         return jsonify({"success": True})
     return jsonify({"error": "Failed"}), 500
 
+def _grading_job_status(job_id):
+    status = grading_service.get_job_status(job_id)
+    if status:
+        # Without a worker in this process the client drives a queued job via /continue
+        status['worker'] = grading_worker.running
+    return status
+
+def _grade_inline(job_id=None):
+    # No worker in this process (serverless): grade small batches for a few seconds inline,
+    # the job stays queued and the next /continue call picks up where this one stopped
+    claimed = db_service.claim_grading_job(stale_after=GradingWorker.STALE_AFTER, job_id=job_id)
+    if claimed:
+        grading_service.run_job(
+            claimed, budget=grading_service.INLINE_BUDGET, batch_size=grading_service.INLINE_BATCH_SIZE
+        )
+
 @sports_bp.route('/stats/check-results', methods=['POST'])
 def check_results():
-    import concurrent.futures
-    
-    pending = db_service.get_pending_predictions()
-    if not pending:
-        return jsonify({"updated": 0})
-    
-    updated_count = 0
-    
-    def grade_single_prediction(pred):
-        """Fetch and grade a single prediction efficiently"""
-        try:
-            match_id = pred.get('match_id')
-            league = pred.get('league')
-            p_data = pred.get('prediction_data', {})
-            struc = p_data.get('structured_prediction')
-            
-            if not struc or not match_id or not league:
-                return None
-            
-            # Directly fetch this specific game
-            game_result = None
-            
-            if league and league != 'all':
-                game_result = sports_service.get_finished_game(match_id, league)
-            else:
-                # If league is 'all' or missing, we must search all leagues for this ID
-                # Iterate through all configured leagues
-                # This is acceptable because it's only for specific single IDs, not a full history fetch
-                for code in sports_service.LEAGUES_CONFIG.keys():
-                    res = sports_service.get_finished_game(match_id, code)
-                    if res:
-                        game_result = res
-                        break
-            
-            if not game_result or game_result.get('status') != 'post':
-                return None  # Game not finished yet
-            
-            # Extract scores
-            h_score = game_result.get('home_score', 0)
-            a_score = game_result.get('away_score', 0)
-            
-            # Determine result based on market type
-            result = 'Void'
-            market_type = struc.get('market_type')
-            
-            if market_type == 'moneyline' or struc.get('type') == 'winner':
-                actual_winner = game_result.get('winner')  # 'home', 'away', 'draw'
-                selection = struc.get('selection', struc.get('target', '')).lower()
-                
-                if selection == actual_winner:
-                    result = 'Win'
-                elif actual_winner == 'draw':
-                    result = 'Win' if selection == 'draw' else 'Loss'
-                else:
-                    result = 'Loss'
-                    
-            elif market_type == 'over_under':
-                total = h_score + a_score
-                line = float(struc.get('line', 0))
-                direction = struc.get('selection', '').lower()
-                
-                if direction == 'over':
-                    result = 'Win' if total > line else 'Loss'
-                elif direction == 'under':
-                    result = 'Win' if total < line else 'Loss'
-                    
-            elif market_type == 'double_chance':
-                actual_winner = game_result.get('winner')
-                sel = struc.get('selection', '').upper()
-                
-                if sel == '1X':
-                    result = 'Win' if actual_winner in ['home', 'draw'] else 'Loss'
-                elif sel == 'X2':
-                    result = 'Win' if actual_winner in ['away', 'draw'] else 'Loss'
-                elif sel == '12':
-                    result = 'Win' if actual_winner in ['home', 'away'] else 'Loss'
-            
-            # Update if we got a valid result
-            if result in ['Win', 'Loss', 'Void']:
-                db_service.update_prediction_result(pred['id'], result)
-                print(f"✓ Graded {match_id}: {result} (Score: {h_score}-{a_score})")
-                return 1
-            
-            return None
-            
-        except Exception as e:
-            print(f"Error grading prediction {pred.get('id')}: {e}")
-            return None
-    
-    # Process all predictions concurrently
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        results = executor.map(grade_single_prediction, pending)
-        updated_count = sum(r for r in results if r)
-    
-    return jsonify({"updated": updated_count})
+    # Only enqueues (or returns the active job), grading happens on the background worker
+    job = db_service.create_grading_job()
+    if not job:
+        return jsonify({"error": "Failed to queue grading job"}), 500
+
+    if grading_worker.running:
+        grading_worker.notify()
+    else:
+        _grade_inline(job['id'])
+
+    return jsonify(_grading_job_status(job['id'])), 202
+
+@sports_bp.route('/stats/check-results/<int:job_id>')
+def check_results_status(job_id):
+    status = _grading_job_status(job_id)
+    if not status:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
+
+@sports_bp.route('/stats/check-results/<int:job_id>/continue', methods=['POST'])
+def check_results_continue(job_id):
+    # Runs the next batch of this job inline; only nudges the worker when there is one,
+    # and does nothing for a finished job (claiming only picks queued or stale jobs)
+    if grading_worker.running:
+        grading_worker.notify()
+    else:
+        _grade_inline(job_id)
+    status = _grading_job_status(job_id)
+    if not status:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(status)
         
 @sports_bp.route('/predict', methods=['POST'])
 def predict():
@@ -169,8 +145,16 @@ def predict():
     
     if not home or not away:
         return jsonify({'error': 'Missing team data'}), 400
+
+    # Opt-in async mode: return a job id right away and let the client poll
+    if data.get('async') or request.args.get('async') == '1':
+        job = prediction_jobs.submit(home, away, league, event_id=event_id, device=device)
+        if not job:
+            return jsonify({'error': 'Failed to queue prediction'}), 500
+        job['poll_url'] = f"/sports/predict/jobs/{job['job_id']}"
+        return jsonify(job), 202
         
-    prediction = gemini_service.get_prediction(home, away, league)
+    prediction = gemini_service.get_prediction(home, away, league, event_id=event_id)
     
     # Store prediction in DB if successful
     if prediction and 'error' not in prediction:
@@ -185,9 +169,61 @@ def predict():
         
     return jsonify(prediction)
 
+@sports_bp.route('/predict/jobs/<job_id>')
+def predict_job(job_id):
+    job = prediction_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@sports_bp.route('/predict/stream', methods=['POST'])
+def predict_stream():
+    """Same contract as /predict, but streams the prediction as server-sent events."""
+    data = request.json or {}
+    home = data.get('home_team')
+    away = data.get('away_team')
+    league = data.get('league')
+    event_id = data.get('event_id')
+    device = data.get('device', 'Unknown')
+
+    if not home or not away:
+        return jsonify({'error': 'Missing team data'}), 400
+
+    def generate():
+        # Padding comment so proxies flush the first bytes immediately
+        yield ": stream open\n\n"
+        for event, payload in gemini_service.stream_prediction(home, away, league, event_id=event_id):
+            if event == 'final':
+                db_service.save_prediction({
+                    "id": event_id if event_id else f"{home}-{away}-{league}",
+                    "home_team": home,
+                    "away_team": away,
+                    "league": league,
+                    "device": device
+                }, payload)
+            yield f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @sports_bp.route('/game/<league>/<event_id>/stats')
 def get_game_stats(league, event_id):
     stats = sports_service.get_game_stats(event_id, league)
     if not stats:
         return jsonify({'error': 'Stats not found'}), 404
     return jsonify(stats)
+
+@sports_bp.route('/metrics')
+def metrics():
+    return jsonify({
+        "espn_cache": sports_service.get_cache_stats(),
+        "espn_http": sports_service.get_http_stats(),
+        "espn_singleflight": sports_service.get_singleflight_stats(),
+        "espn_fanout": sports_service.get_fanout_stats(),
+        "scoreboard_refresher": sports_service.get_refresher_stats(),
+        "llm_gate": gemini_service.get_limiter_stats(),
+        "db_pool": db_service.get_pool_stats(),
+        "visit_buffer": db_service.get_visit_buffer_stats()
+    })
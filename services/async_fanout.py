@@ -0,0 +1,115 @@
+import asyncio
+import concurrent.futures
+import os
+import threading
+from services import http_client
+
+# Upper bound on concurrent upstream calls across ALL requests in this process
+MAX_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", http_client.POOL_SIZE))
+FANOUT_TIMEOUT = float(os.getenv("FANOUT_TIMEOUT", 20))
+
+_loop = None
+_executor = None
+_semaphore = None
+_start_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "items": 0, "errors": 0, "timeouts": 0, "in_flight": 0}
+
+
+class FanoutTimeout(Exception):
+    """Result for an item that did not finish within the fan-out deadline."""
+
+
+def _get_loop():
+    """Starts the single background event loop on first use."""
+    global _loop, _executor
+    if _loop is None:
+        with _start_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                # Blocking HTTP calls run here; one bounded pool for the whole process
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=MAX_CONCURRENCY, thread_name_prefix="fanout"
+                )
+                loop.set_default_executor(_executor)
+                thread = threading.Thread(target=loop.run_forever, name="fanout-loop", daemon=True)
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+async def _run_bounded(fn, item):
+    global _semaphore
+    if _semaphore is None:
+        # Created lazily so it binds to the fan-out loop (we are on the loop thread here)
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    await _semaphore.acquire()
+    try:
+        future = asyncio.get_running_loop().run_in_executor(None, fn, item)
+    except Exception:
+        _semaphore.release()
+        raise
+    with _stats_lock:
+        _stats["in_flight"] += 1
+    # The slot is only given back once the executor thread is done: a timed-out
+    # task is cancelled, but its blocking call keeps a thread (and a connection) busy
+    future.add_done_callback(_release_slot)
+    return await asyncio.shield(future)
+
+
+def _release_slot(future):
+    if not future.cancelled():
+        # Mark the exception retrieved, nobody may be awaiting an abandoned call
+        future.exception()
+    with _stats_lock:
+        _stats["in_flight"] -= 1
+    _semaphore.release()
+
+
+async def _gather(fn, items, timeout):
+    tasks = {asyncio.ensure_future(_run_bounded(fn, item)): item for item in items}
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks.keys(), timeout=timeout)
+
+    results = []
+    for task in done:
+        exc = task.exception()
+        results.append((tasks[task], exc if exc else task.result()))
+    for task in pending:
+        # The executor thread cannot be interrupted; it runs to completion unobserved
+        # and keeps its concurrency slot until then
+        task.cancel()
+        print(f"Fan-out task for {tasks[task]} timed out after {timeout}s")
+        results.append((tasks[task], FanoutTimeout(f"{tasks[task]} timed out after {timeout}s")))
+    return results
+
+
+def map_blocking(fn, items, timeout=None):
+    """
+    Runs fn(item) for every item with bounded concurrency on the shared loop
+    and blocks the calling (Flask) thread until all finish or the timeout hits.
+    Returns a list of (item, result) pairs; result is the exception if fn raised,
+    or a FanoutTimeout if the item missed the deadline.
+    """
+    timeout = FANOUT_TIMEOUT if timeout is None else timeout
+    future = asyncio.run_coroutine_threadsafe(_gather(fn, list(items), timeout), _get_loop())
+    # Small grace period on top of the inner timeout for the loop to hand results back
+    results = future.result(timeout + 5)
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["items"] += len(results)
+        for _, result in results:
+            if isinstance(result, FanoutTimeout):
+                _stats["timeouts"] += 1
+            elif isinstance(result, Exception):
+                _stats["errors"] += 1
+    return results
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["max_concurrency"] = MAX_CONCURRENCY
+    stats["timeout"] = FANOUT_TIMEOUT
+    return stats
@@ -0,0 +1,73 @@
+import atexit
+import threading
+
+
+class BufferedCounter:
+    """
+    In-memory counter whose accumulated delta is handed to `flush(delta)` every
+    `interval` seconds and at interpreter exit. A failed flush keeps the delta
+    for the next attempt.
+    """
+
+    def __init__(self, flush, interval=10.0, name="counter-flush"):
+        self._flush = flush
+        self.interval = interval
+        self.name = name
+        self._pending = 0
+        self._lock = threading.Lock()
+        # Serialises flushes so an interval flush and the exit flush never write the same delta
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"added": 0, "flushes": 0, "flushed": 0, "failed_flushes": 0}
+
+    @property
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def add(self, n=1):
+        with self._lock:
+            self._pending += n
+            self.stats["added"] += n
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                delta, self._pending = self._pending, 0
+            if not delta:
+                return True
+            try:
+                ok = self._flush(delta)
+            except Exception as e:
+                print(f"{self.name} failed: {e}")
+                ok = False
+            with self._lock:
+                if ok:
+                    self.stats["flushes"] += 1
+                    self.stats["flushed"] += delta
+                else:
+                    self._pending += delta
+                    self.stats["failed_flushes"] += 1
+            return ok
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["pending"] = self._pending
+            stats["interval"] = self.interval
+        return stats
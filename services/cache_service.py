@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+class ResponseCache:
+    """
+    Bounded in-process LRU cache for ESPN responses keyed by (url, params).
+    The TTL of each entry depends on the state of the games in the payload:
+    live games expire in seconds, pre-match windows in minutes and windows
+    that only contain finished games are kept (practically) forever, unless
+    the window reaches today, where late results and corrections still land.
+
+    Besides the entry count, the cache is bounded by the summed wire size of
+    the cached responses (the parsed objects take a few times that in memory).
+    """
+
+    LIVE_TTL = int(os.getenv("ESPN_CACHE_LIVE_TTL", 15))
+    PRE_TTL = int(os.getenv("ESPN_CACHE_PRE_TTL", 300))
+    POST_TTL = int(os.getenv("ESPN_CACHE_POST_TTL", 86400))
+    MAX_ENTRIES = int(os.getenv("ESPN_CACHE_MAX_ENTRIES", 512))
+    # Summed response body size across entries; a single response larger than a quarter of it is not cached
+    MAX_BYTES = int(os.getenv("ESPN_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.oversized = 0
+
+    @staticmethod
+    def make_key(url, params=None):
+        return (url, tuple(sorted((params or {}).items())))
+
+    def _payload_states(self, payload):
+        # Scoreboard payloads carry a list of events, summary payloads a header
+        states = set()
+        for event in payload.get('events', []) or []:
+            try:
+                states.add(event['status']['type']['state'])
+            except (KeyError, TypeError):
+                continue
+        if not states and 'header' in payload:
+            try:
+                states.add(payload['header']['competitions'][0]['status']['type']['state'])
+            except (KeyError, IndexError, TypeError):
+                pass
+        return states
+
+    @staticmethod
+    def _window_is_open(params):
+        """True when a scoreboard date window reaches yesterday or later (ESPN days are US local)."""
+        dates = (params or {}).get('dates')
+        if not dates:
+            return True  # The default scoreboard is today's
+        end = str(dates).split('-')[-1]
+        return end >= (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+
+    def ttl_for(self, payload, params=None):
+        states = self._payload_states(payload)
+        if 'in' in states:
+            return self.LIVE_TTL
+        if states and states == {'post'}:
+            if 'events' in payload and self._window_is_open(params):
+                return self.PRE_TTL
+            return self.POST_TTL
+        # 'pre', mixed pre/post or an empty window
+        return self.PRE_TTL
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload, size = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def set(self, key, payload, ttl=None, size=0):
+        """Caches payload; `size` is its response body length in bytes, counted against max_bytes."""
+        if not payload:
+            return
+        if size > self.max_bytes // 4:
+            # One huge range payload would push out most of the cache
+            with self._lock:
+                self.oversized += 1
+            return
+        if ttl is None:
+            ttl = self.ttl_for(payload)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (time.monotonic() + ttl, payload, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "oversized": self.oversized,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0
+            }
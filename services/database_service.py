@@ -1,7 +1,10 @@
 
 import sqlite3
+import base64
 import json
 import os
+import threading
+import time
 try:
     import psycopg2
     from psycopg2.extras import RealDictCursor
@@ -9,16 +12,90 @@ except ImportError:
     psycopg2 = None
     RealDictCursor = None
 from datetime import datetime
+from services.db_pool import ConnectionPool
+from services.buffered_counter import BufferedCounter
 
 class DatabaseService:
-    # On Vercel, the root is read-only, so we must use /tmp
-    DB_NAME = "/tmp/safepick.db" if os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "safepick.db"
+    # On Vercel, the root is read-only, so we must use /tmp. SQLITE_PATH overrides both.
+    DB_NAME = os.getenv("SQLITE_PATH") or ("/tmp/safepick.db" if os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "safepick.db")
+
+    # Connections per process and database, shared by every DatabaseService instance
+    POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))
+    # Idle connections older than this are pinged before being handed out
+    POOL_CHECK_AFTER = float(os.getenv("DB_POOL_CHECK_AFTER", 30))
+    SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", 15))
+
+    # Per-connection SQLite tuning (journal_mode=WAL is persistent and set by a migration).
+    # synchronous=NORMAL is durable under WAL except for the last commits on power loss.
+    SQLITE_PRAGMAS = (
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', 8192))}",
+        "PRAGMA temp_store=MEMORY",
+        f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_BYTES', 64 * 1024 * 1024))}",
+    )
+
+    # (version, description, statements, backend or None for both), applied once and
+    # recorded in schema_migrations. Append new entries, never edit applied ones.
+    SCHEMA_MIGRATIONS = [
+        (1, "SQLite WAL journaling", [
+            "PRAGMA journal_mode=WAL",
+        ], "sqlite"),
+        (2, "Indexes for pending, recent and per-match prediction lookups", [
+            "CREATE INDEX IF NOT EXISTS idx_predictions_result ON predictions (result)",
+            "CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions (created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_predictions_match_id ON predictions (match_id)",
+            "CREATE INDEX IF NOT EXISTS idx_grading_jobs_status ON grading_jobs (status)",
+            "CREATE INDEX IF NOT EXISTS idx_prediction_jobs_match_key ON prediction_jobs (match_key)",
+            "CREATE INDEX IF NOT EXISTS idx_prediction_cache_expires_at ON prediction_cache (expires_at)",
+        ], None),
+        (3, "Materialized prediction counters per league and market type", [
+            '''
+            CREATE TABLE IF NOT EXISTS prediction_counters (
+                league TEXT NOT NULL,
+                market_type TEXT NOT NULL,
+                predictions INTEGER NOT NULL DEFAULT 0,
+                wins INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0,
+                voids INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (league, market_type)
+            )
+            ''',
+            lambda db, cursor: db._rebuild_counters_from_json(cursor),
+        ], None),
+        (4, "Composite (created_at, id) index for keyset pagination", [
+            "CREATE INDEX IF NOT EXISTS idx_predictions_created_id ON predictions (created_at, id)",
+            "DROP INDEX IF EXISTS idx_predictions_created_at",
+        ], None),
+        (5, "Typed market_type, selection, line and confidence columns on predictions", [
+            lambda db, cursor: db._add_typed_columns(cursor),
+            lambda db, cursor: db._backfill_typed_columns(cursor),
+            "CREATE INDEX IF NOT EXISTS idx_predictions_market_result ON predictions (market_type, result)",
+        ], None),
+        (6, "Mark structured picks without a recognised market as market_type 'unknown'", [
+            lambda db, cursor: db._backfill_typed_columns(cursor),
+        ], None),
+    ]
+    SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
+
+    # market_type of a structured pick whose market is not recognised; it stays gradable (as Void)
+    UNKNOWN_MARKET = 'unknown'
+
+    # prediction_counters column moved by each graded result
+    RESULT_COUNTERS = {'Win': 'wins', 'Loss': 'losses', 'Void': 'voids'}
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    # Page views buffered in memory and written in one UPDATE per interval (see enable_visit_buffer)
+    VISIT_FLUSH_INTERVAL = float(os.getenv("VISIT_FLUSH_INTERVAL", 10))
+    _visit_buffer = None
 
     def __init__(self):
         self.db_url = os.getenv("DATABASE_URL")
         self._init_db()
 
-    def _get_connection(self):
+    def _connect(self):
         if self.db_url:
             try:
                 return psycopg2.connect(self.db_url)
@@ -28,7 +105,39 @@ class DatabaseService:
                 # For now let's assume if URL is there, we want it to work or fail.
                 raise e
         else:
-            return sqlite3.connect(self.DB_NAME)
+            # Pooled connections are handed between threads, one user at a time
+            conn = sqlite3.connect(self.DB_NAME, timeout=self.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+            for pragma in self.SQLITE_PRAGMAS:
+                conn.execute(pragma)
+            return conn
+
+    def _get_pool(self):
+        # Keyed by pid as well: connections inherited across a gunicorn fork must not be shared
+        key = (os.getpid(), self.db_url or self.DB_NAME)
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    pool = ConnectionPool(
+                        self._connect, size=self.POOL_SIZE, timeout=self.POOL_TIMEOUT,
+                        check_after=self.POOL_CHECK_AFTER,
+                        is_broken=(lambda conn: conn.closed != 0) if self.db_url else None
+                    )
+                    DatabaseService._pools[key] = pool
+        return pool
+
+    def _get_connection(self):
+        """Borrows a pooled connection; close() returns it to the pool."""
+        return self._get_pool().acquire()
+
+    def get_visit_buffer_stats(self):
+        return self._visit_buffer.get_stats() if self._visit_buffer is not None else {"enabled": False}
+
+    def get_pool_stats(self):
+        stats = self._get_pool().get_stats()
+        stats["backend"] = "postgres" if self.db_url else "sqlite"
+        return stats
 
     def _get_placeholder(self):
         return "%s" if self.db_url else "?"
@@ -37,6 +146,11 @@ class DatabaseService:
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
+
+            version = self._schema_version(conn, cursor)
+            if version >= self.SCHEMA_VERSION:
+                conn.close()
+                return # Schema is current, nothing to create or migrate
             
             # Predictions table
             if self.db_url:
@@ -74,6 +188,68 @@ class DatabaseService:
                 cursor.execute('INSERT INTO site_stats (param_key, param_value) VALUES (%s, %s) ON CONFLICT (param_key) DO NOTHING', ('total_visits', 0))
                 cursor.execute('INSERT INTO site_stats (param_key, param_value) VALUES (%s, %s) ON CONFLICT (param_key) DO NOTHING', ('total_predictions', 0))
 
+                # Finished games archived per league and per day (see SportsService history)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS history_chunks (
+                        league TEXT NOT NULL,
+                        day TEXT NOT NULL,
+                        games_json TEXT,
+                        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (league, day)
+                    )
+                ''')
+
+                # ESPN event id -> league, filled whenever a scoreboard is processed
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS event_index (
+                        event_id TEXT PRIMARY KEY,
+                        league TEXT NOT NULL,
+                        event_date TEXT
+                    )
+                ''')
+
+                # Background grading jobs and their progress (times are unix seconds)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS grading_jobs (
+                        id SERIAL PRIMARY KEY,
+                        status TEXT NOT NULL,
+                        total INTEGER DEFAULT 0,
+                        processed INTEGER DEFAULT 0,
+                        updated INTEGER DEFAULT 0,
+                        last_id INTEGER DEFAULT 0,
+                        error TEXT,
+                        created_at DOUBLE PRECISION,
+                        started_at DOUBLE PRECISION,
+                        updated_at DOUBLE PRECISION,
+                        finished_at DOUBLE PRECISION
+                    )
+                ''')
+
+                # LLM predictions shared across workers, keyed by match + prompt hash + model
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS prediction_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        prediction_json TEXT,
+                        model TEXT,
+                        prompt_hash TEXT,
+                        created_at DOUBLE PRECISION,
+                        expires_at DOUBLE PRECISION
+                    )
+                ''')
+
+                # Asynchronous /predict jobs, pollable from any worker
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS prediction_jobs (
+                        job_id TEXT PRIMARY KEY,
+                        match_key TEXT,
+                        status TEXT NOT NULL,
+                        result_json TEXT,
+                        error TEXT,
+                        created_at DOUBLE PRECISION,
+                        updated_at DOUBLE PRECISION
+                    )
+                ''')
+
             else:
                 # SQLite Syntax
                 cursor.execute('''
@@ -106,12 +282,117 @@ class DatabaseService:
                 
                 cursor.execute('INSERT OR IGNORE INTO site_stats (param_key, param_value) VALUES ("total_visits", 0)')
                 cursor.execute('INSERT OR IGNORE INTO site_stats (param_key, param_value) VALUES ("total_predictions", 0)')
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS history_chunks (
+                        league TEXT NOT NULL,
+                        day TEXT NOT NULL,
+                        games_json TEXT,
+                        fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                        PRIMARY KEY (league, day)
+                    )
+                ''')
+
+                # ESPN event id -> league, filled whenever a scoreboard is processed
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS event_index (
+                        event_id TEXT PRIMARY KEY,
+                        league TEXT NOT NULL,
+                        event_date TEXT
+                    )
+                ''')
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS grading_jobs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        status TEXT NOT NULL,
+                        total INTEGER DEFAULT 0,
+                        processed INTEGER DEFAULT 0,
+                        updated INTEGER DEFAULT 0,
+                        last_id INTEGER DEFAULT 0,
+                        error TEXT,
+                        created_at REAL,
+                        started_at REAL,
+                        updated_at REAL,
+                        finished_at REAL
+                    )
+                ''')
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS prediction_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        prediction_json TEXT,
+                        model TEXT,
+                        prompt_hash TEXT,
+                        created_at REAL,
+                        expires_at REAL
+                    )
+                ''')
+
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS prediction_jobs (
+                        job_id TEXT PRIMARY KEY,
+                        match_key TEXT,
+                        status TEXT NOT NULL,
+                        result_json TEXT,
+                        error TEXT,
+                        created_at REAL,
+                        updated_at REAL
+                    )
+                ''')
             
             conn.commit()
+            self._apply_migrations(conn, cursor, version)
             conn.close()
         except Exception as e:
             print(f"DB Init Error: {e}")
 
+    def _schema_version(self, conn, cursor):
+        try:
+            cursor.execute("SELECT MAX(version) FROM schema_migrations")
+            row = cursor.fetchone()
+            return (row[0] if row else 0) or 0
+        except Exception:
+            conn.rollback() # Table does not exist yet (Postgres aborts the transaction)
+            return 0
+
+    def _apply_migrations(self, conn, cursor, version):
+        backend = "postgres" if self.db_url else "sqlite"
+        if self.db_url:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at DOUBLE PRECISION
+                )
+            ''')
+            record = "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s) ON CONFLICT (version) DO NOTHING"
+        else:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at REAL
+                )
+            ''')
+            record = "INSERT OR IGNORE INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)"
+        conn.commit()
+
+        for number, description, statements, only_on in self.SCHEMA_MIGRATIONS:
+            if number <= version:
+                continue
+            if only_on in (None, backend):
+                for statement in statements:
+                    # Data migrations are callables taking (db_service, cursor)
+                    if callable(statement):
+                        statement(self, cursor)
+                    else:
+                        cursor.execute(statement)
+            # Recorded on every backend so versions stay comparable
+            cursor.execute(record, (number, description, time.time()))
+            conn.commit()
+            print(f"Applied schema migration {number}: {description}")
+
     def save_prediction(self, match_data, prediction_result):
         try:
             conn = self._get_connection()
@@ -119,16 +400,19 @@ class DatabaseService:
             
             ph = self._get_placeholder()
             
+            market_type, selection, line, confidence = self._typed_fields(prediction_result)
             cursor.execute(f'''
-                INSERT INTO predictions (match_id, home_team, away_team, league, prediction_json, device)
-                VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph})
+                INSERT INTO predictions (match_id, home_team, away_team, league, prediction_json, device,
+                                         market_type, selection, line, confidence)
+                VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph}, {ph})
             ''', (
                 match_data.get('id', 'unknown'),
                 match_data.get('home_team'),
                 match_data.get('away_team'),
                 match_data.get('league'),
                 json.dumps(prediction_result),
-                match_data.get('device', 'Unknown')
+                match_data.get('device', 'Unknown'),
+                market_type, selection, line, confidence
             ))
             
             # Increment total predictions count
@@ -136,6 +420,8 @@ class DatabaseService:
                 cursor.execute('UPDATE site_stats SET param_value = param_value + 1 WHERE param_key = %s', ('total_predictions',))
             else:
                 cursor.execute('UPDATE site_stats SET param_value = param_value + 1 WHERE param_key = "total_predictions"')
+
+            self._bump_counters(cursor, *self._counter_key(match_data.get('league'), market_type), predictions=1)
             
             conn.commit()
             conn.close()
@@ -144,18 +430,38 @@ class DatabaseService:
             print(f"DB Error saving prediction: {e}")
             return False
 
+    @classmethod
+    def enable_visit_buffer(cls):
+        """
+        Buffers increment_visit in memory and flushes the delta every VISIT_FLUSH_INTERVAL
+        seconds and at shutdown. Only for long-running processes; serverless writes through.
+        """
+        if cls._visit_buffer is None and cls.VISIT_FLUSH_INTERVAL > 0:
+            db = cls()
+            cls._visit_buffer = BufferedCounter(db.add_visits, cls.VISIT_FLUSH_INTERVAL, name="visit-flush")
+            cls._visit_buffer.start()
+        return cls._visit_buffer
+
     def increment_visit(self):
+        if self._visit_buffer is not None:
+            self._visit_buffer.add(1)
+        else:
+            self.add_visits(1)
+
+    def add_visits(self, count):
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
             if self.db_url:
-                cursor.execute('UPDATE site_stats SET param_value = param_value + 1 WHERE param_key = %s', ('total_visits',))
+                cursor.execute('UPDATE site_stats SET param_value = param_value + %s WHERE param_key = %s', (count, 'total_visits'))
             else:
-                cursor.execute('UPDATE site_stats SET param_value = param_value + 1 WHERE param_key = "total_visits"')
+                cursor.execute('UPDATE site_stats SET param_value = param_value + ? WHERE param_key = "total_visits"', (count,))
             conn.commit()
             conn.close()
+            return True
         except Exception as e:
             print(f"DB Error incrementing visit: {e}")
+            return False
 
     def get_stats(self):
         try:
@@ -170,128 +476,371 @@ class DatabaseService:
                  
             visits = cursor.fetchone()
             total_visits = int(visits[0]) if visits else 0
-            
-            cursor.execute("SELECT COUNT(*) FROM predictions")
-            total_predictions = cursor.fetchone()[0]
+            # Views counted by this process but not flushed yet
+            if self._visit_buffer is not None:
+                total_visits += self._visit_buffer.pending
 
-            # Calculate Win Rate
-            if self.db_url:
-                cursor.execute("SELECT COUNT(*) FROM predictions WHERE result=%s", ('Win',))
-            else:
-                cursor.execute("SELECT COUNT(*) FROM predictions WHERE result='Win'")
-            wins = cursor.fetchone()[0]
-            
-            if self.db_url:
-                cursor.execute("SELECT COUNT(*) FROM predictions WHERE result IN (%s, %s)", ('Win', 'Loss'))
-            else:
-                cursor.execute("SELECT COUNT(*) FROM predictions WHERE result IN ('Win', 'Loss')")
-            total_results = cursor.fetchone()[0]
+            # Totals come from the materialized counters, a handful of rows however large predictions grows
+            cursor.execute("SELECT league, market_type, predictions, wins, losses, voids FROM prediction_counters")
+            rows = cursor.fetchall()
+            conn.close()
+
+            by_league, by_market = {}, {}
+            for league, market_type, predictions, wins, losses, voids in rows:
+                for group, key in ((by_league, league), (by_market, market_type)):
+                    entry = group.setdefault(key, {"predictions": 0, "wins": 0, "losses": 0, "voids": 0})
+                    entry["predictions"] += predictions
+                    entry["wins"] += wins
+                    entry["losses"] += losses
+                    entry["voids"] += voids
+
+            total_predictions = sum(r[2] for r in rows)
+            wins = sum(r[3] for r in rows)
+            total_results = wins + sum(r[4] for r in rows)
             
             win_rate = 0
             if total_results > 0:
                 win_rate = int((wins / total_results) * 100)
 
-            conn.close()
             return {
                 "total_visits": total_visits,
                 "total_predictions": total_predictions,
                 "win_rate": win_rate,
-                "total_graded": total_results
+                "total_graded": total_results,
+                "by_league": self._counter_rows(by_league, "league"),
+                "by_market": self._counter_rows(by_market, "market_type")
             }
         except Exception as e:
             print(f"DB Error fetching stats: {e}")
-            return {"total_visits": 0, "total_predictions": 0, "win_rate": 0, "total_graded": 0}
+            return {"total_visits": 0, "total_predictions": 0, "win_rate": 0, "total_graded": 0, "by_league": [], "by_market": []}
 
-    def update_prediction_result(self, prediction_id, result):
+    @staticmethod
+    def _counter_rows(groups, name):
+        rows = []
+        for key, entry in groups.items():
+            graded = entry["wins"] + entry["losses"]
+            entry[name] = key
+            entry["graded"] = graded
+            entry["win_rate"] = int(entry["wins"] / graded * 100) if graded else 0
+            rows.append(entry)
+        return sorted(rows, key=lambda r: r["predictions"], reverse=True)
+
+    @staticmethod
+    def _typed_fields(prediction):
+        """(market_type, selection, line, confidence) promoted from structured_prediction."""
+        struc = (prediction or {}).get('structured_prediction') or {}
+        if not isinstance(struc, dict) or not struc:
+            return None, None, None, None
+        # Early predictions used {'type': 'winner', 'target': ...} for moneylines
+        market_type = struc.get('market_type') or (
+            'moneyline' if struc.get('type') == 'winner' else DatabaseService.UNKNOWN_MARKET
+        )
+        selection = struc.get('selection', struc.get('target'))
+        try:
+            line = float(struc['line']) if struc.get('line') is not None else None
+        except (TypeError, ValueError):
+            line = None
+        confidence = struc.get('confidence')
+        return (
+            market_type,
+            str(selection) if selection is not None else None,
+            line,
+            str(confidence) if confidence is not None else None,
+        )
+
+    @staticmethod
+    def _counter_key(league, market_type):
+        """(league, market_type) a prediction is counted under."""
+        return league or 'unknown', market_type or 'unknown'
+
+    def _bump_counters(self, cursor, league, market_type, predictions=0, wins=0, losses=0, voids=0):
+        """Adds deltas to one counter row, inside the caller's transaction."""
+        ph = self._get_placeholder()
+        cursor.execute(f'''
+            INSERT INTO prediction_counters (league, market_type, predictions, wins, losses, voids)
+            VALUES ({ph}, {ph}, {ph}, {ph}, {ph}, {ph})
+            ON CONFLICT (league, market_type) DO UPDATE SET
+                predictions = prediction_counters.predictions + excluded.predictions,
+                wins = prediction_counters.wins + excluded.wins,
+                losses = prediction_counters.losses + excluded.losses,
+                voids = prediction_counters.voids + excluded.voids
+        ''', (league, market_type, predictions, wins, losses, voids))
+
+    def _result_deltas(self, old_result, new_result):
+        deltas = {}
+        if old_result in self.RESULT_COUNTERS:
+            deltas[self.RESULT_COUNTERS[old_result]] = -1
+        if new_result in self.RESULT_COUNTERS:
+            column = self.RESULT_COUNTERS[new_result]
+            deltas[column] = deltas.get(column, 0) + 1
+        return deltas
+
+    def _rebuild_counters(self, cursor):
+        cursor.execute("DELETE FROM prediction_counters")
+        cursor.execute('''
+            INSERT INTO prediction_counters (league, market_type, predictions, wins, losses, voids)
+            SELECT COALESCE(NULLIF(league, ''), 'unknown'), COALESCE(NULLIF(market_type, ''), 'unknown'), COUNT(*),
+                   SUM(CASE WHEN result = 'Win' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN result = 'Loss' THEN 1 ELSE 0 END),
+                   SUM(CASE WHEN result = 'Void' THEN 1 ELSE 0 END)
+            FROM predictions GROUP BY 1, 2
+        ''')
+
+    def _rebuild_counters_from_json(self, cursor):
+        # Schema version 3 predates the typed columns, so it classifies from prediction_json
+        cursor.execute("DELETE FROM prediction_counters")
+        cursor.execute("SELECT league, prediction_json, result FROM predictions")
+        totals = {}
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for league, prediction_json, result in rows:
+                try:
+                    prediction = json.loads(prediction_json) if prediction_json else {}
+                except ValueError:
+                    prediction = {}
+                entry = totals.setdefault(
+                    self._counter_key(league, self._typed_fields(prediction)[0]),
+                    {"predictions": 0, "wins": 0, "losses": 0, "voids": 0}
+                )
+                entry["predictions"] += 1
+                if result in self.RESULT_COUNTERS:
+                    entry[self.RESULT_COUNTERS[result]] += 1
+        for (league, market_type), counts in totals.items():
+            self._bump_counters(cursor, league, market_type, **counts)
+
+    def _add_typed_columns(self, cursor):
+        columns = [("market_type", "TEXT"), ("selection", "TEXT"),
+                   ("line", "DOUBLE PRECISION" if self.db_url else "REAL"), ("confidence", "TEXT")]
+        if self.db_url:
+            for name, sql_type in columns:
+                cursor.execute(f"ALTER TABLE predictions ADD COLUMN IF NOT EXISTS {name} {sql_type}")
+        else:
+            cursor.execute("PRAGMA table_info(predictions)")
+            existing = {row[1] for row in cursor.fetchall()}
+            for name, sql_type in columns:
+                if name not in existing:
+                    cursor.execute(f"ALTER TABLE predictions ADD COLUMN {name} {sql_type}")
+
+    def _backfill_typed_columns(self, cursor):
+        ph = self._get_placeholder()
+        cursor.execute("SELECT id, prediction_json FROM predictions WHERE market_type IS NULL AND prediction_json IS NOT NULL")
+        updates = []
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for prediction_id, prediction_json in rows:
+                try:
+                    fields = self._typed_fields(json.loads(prediction_json))
+                except ValueError:
+                    continue
+                if any(value is not None for value in fields):
+                    updates.append(fields + (prediction_id,))
+        if updates:
+            cursor.executemany(
+                f"UPDATE predictions SET market_type = {ph}, selection = {ph}, line = {ph}, confidence = {ph} WHERE id = {ph}",
+                updates
+            )
+
+    def rebuild_counters(self):
+        """Recomputes prediction_counters from the predictions table in one transaction."""
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
-            ph = self._get_placeholder()
-            
-            cursor.execute(f"UPDATE predictions SET result = {ph} WHERE id = {ph}", (result, prediction_id))
+            self._rebuild_counters(cursor)
             conn.commit()
             conn.close()
             return True
         except Exception as e:
-            print(f"Error updating result: {e}")
+            print(f"DB Error rebuilding counters: {e}")
             return False
 
-    def get_recent_predictions(self, limit=10):
+    def update_prediction_result(self, prediction_id, result):
+        return self.update_prediction_results([(prediction_id, result)]) == 1
+
+    def update_prediction_results(self, pairs):
+        """
+        Writes many (prediction_id, result) pairs and their counter deltas in one
+        transaction. Returns how many of the predictions exist (and now hold their result).
+        Pairs whose id is missing or not numeric are skipped.
+        """
         try:
-            conn = self._get_connection()
-            
-            # Use RealDictCursor for Postgres to get dictionary like results
-            if self.db_url:
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
-            else:
-                cursor = conn.cursor()
+            results = {}
+            invalid = 0
+            for prediction_id, result in pairs:
+                try:
+                    results[int(prediction_id)] = result
+                except (TypeError, ValueError):
+                    invalid += 1
+            if invalid:
+                print(f"Skipped {invalid} result update(s) with an invalid prediction id")
+            if not results:
+                return 0
 
+            conn = self._get_connection()
+            cursor = conn.cursor()
             ph = self._get_placeholder()
-            cursor.execute(f'SELECT * FROM predictions ORDER BY created_at DESC LIMIT {ph}', (limit,))
-            
-            predictions = []
-            if self.db_url:
-                # RealDictCursor returns dict-like objects
-                for row in cursor.fetchall():
-                    pred = dict(row)
-                    if pred.get('prediction_json'):
-                        try:
-                            pred['prediction_data'] = json.loads(pred['prediction_json'])
-                        except:
-                            pred['prediction_data'] = {}
-                    predictions.append(pred)
-            else:
-                # SQLite default cursor
-                columns = [col[0] for col in cursor.description]
+            ids = list(results)
+
+            # Lock the rows up front so counter deltas match what is actually overwritten
+            if not self.db_url:
+                cursor.execute("BEGIN IMMEDIATE")
+            current = {}
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                cursor.execute(
+                    f"SELECT id, league, market_type, result FROM predictions WHERE id IN ({', '.join([ph] * len(batch))})"
+                    + (" FOR UPDATE" if self.db_url else ""),
+                    batch
+                )
                 for row in cursor.fetchall():
-                    pred = dict(zip(columns, row))
-                    if pred.get('prediction_json'):
-                        try:
-                            pred['prediction_data'] = json.loads(pred['prediction_json'])
-                        except:
-                            pred['prediction_data'] = {}
-                    predictions.append(pred)
-            
+                    current[row[0]] = row[1:]
+
+            updates = []
+            counter_deltas = {}
+            for prediction_id, (league, market_type, old_result) in current.items():
+                result = results[prediction_id]
+                if old_result == result:
+                    continue
+                updates.append((result, prediction_id))
+                deltas = self._result_deltas(old_result, result)
+                if deltas:
+                    totals = counter_deltas.setdefault(self._counter_key(league, market_type), {})
+                    for column, delta in deltas.items():
+                        totals[column] = totals.get(column, 0) + delta
+
+            if updates:
+                cursor.executemany(f"UPDATE predictions SET result = {ph} WHERE id = {ph}", updates)
+            for (league, market_type), deltas in counter_deltas.items():
+                self._bump_counters(cursor, league, market_type, **deltas)
+            conn.commit()
             conn.close()
-            return predictions
+            return len(current)
         except Exception as e:
-            print(f"DB Error fetching recent predictions: {e}")
-            return []
+            print(f"Error updating results: {e}")
+            return 0
+
+    # Columns the stats table renders; prediction_json is only mined for best_pick
+    PAGE_COLUMNS = "id, match_id, home_team, away_team, league, result, device, created_at, prediction_json"
+
+    @staticmethod
+    def encode_cursor(created_at, prediction_id):
+        raw = json.dumps([str(created_at), prediction_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
-    def get_pending_predictions(self):
+    @staticmethod
+    def decode_cursor(cursor):
+        """Returns (created_at, id) from an opaque page cursor, or None if it is missing or invalid."""
+        if not cursor:
+            return None
+        try:
+            created_at, prediction_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            return str(created_at), int(prediction_id)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _json_field(text, key):
+        """
+        Decodes one top-level field of a JSON object without parsing the rest of it.
+        Falls back to a full parse when the key cannot be located cheaply.
+        """
+        if not text:
+            return None
+        marker = text.find(f'"{key}"')
+        if marker != -1:
+            colon = text.find(":", marker + len(key) + 2)
+            if colon != -1:
+                start = colon + 1
+                while start < len(text) and text[start] in " \t\r\n":
+                    start += 1
+                try:
+                    return json.JSONDecoder().raw_decode(text, start)[0]
+                except ValueError:
+                    pass
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        return data.get(key) if isinstance(data, dict) else None
+
+    def get_predictions_page(self, limit=50, cursor=None):
+        """
+        Newest-first page of predictions, keyset-paginated on (created_at, id) so a
+        deep page costs the same as the first. Returns (predictions, next_cursor).
+        """
+        limit = max(1, min(int(limit), 200))
+        position = self.decode_cursor(cursor)
         try:
             conn = self._get_connection()
-            if self.db_url:
-                cursor = conn.cursor(cursor_factory=RealDictCursor)
+            db_cursor = conn.cursor()
+            ph = self._get_placeholder()
+            if position:
+                db_cursor.execute(
+                    f"SELECT {self.PAGE_COLUMNS} FROM predictions WHERE created_at < {ph} OR (created_at = {ph} AND id < {ph}) "
+                    f"ORDER BY created_at DESC, id DESC LIMIT {ph}",
+                    (position[0], position[0], position[1], limit + 1)
+                )
             else:
-                cursor = conn.cursor()
+                db_cursor.execute(
+                    f"SELECT {self.PAGE_COLUMNS} FROM predictions ORDER BY created_at DESC, id DESC LIMIT {ph}", (limit + 1,)
+                )
+            columns = [col[0] for col in db_cursor.description]
+            rows = db_cursor.fetchall()
+            conn.close()
+
+            predictions = []
+            for row in rows[:limit]:
+                pred = dict(zip(columns, row))
+                pred['created_at'] = str(pred['created_at']) if pred['created_at'] is not None else None
+                pred['prediction_data'] = {'best_pick': self._json_field(pred.pop('prediction_json'), 'best_pick')}
+                predictions.append(pred)
+
+            next_cursor = None
+            if len(rows) > limit:
+                last = predictions[-1]
+                next_cursor = self.encode_cursor(last['created_at'], last['id'])
+            return predictions, next_cursor
+        except Exception as e:
+            print(f"DB Error fetching predictions page: {e}")
+            return [], None
+
+    def get_pending_predictions(self, after_id=None, limit=None):
+        """
+        Ungraded predictions that carry a structured pick, projected to the typed
+        columns grading needs (no prediction_json is read or decoded).
+        """
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            ph = self._get_placeholder()
             
             # Fetch predictions where result is NULL or empty
-            if self.db_url:
-                 cursor.execute("SELECT * FROM predictions WHERE result IS NULL OR result = ''")
+            query = (
+                "SELECT id, match_id, league, market_type, selection, line, confidence FROM predictions "
+                "WHERE (result IS NULL OR result = '') AND market_type IS NOT NULL"
+            )
+            if after_id is None and limit is None:
+                 cursor.execute(query)
             else:
-                 cursor.execute("SELECT * FROM predictions WHERE result IS NULL OR result = ''")
+                 # Keyset batch for the grading worker, resumable from the last id it processed.
+                 # "No limit" is LIMIT NULL on Postgres and LIMIT -1 on SQLite.
+                 if limit is None:
+                     limit = None if self.db_url else -1
+                 cursor.execute(f"{query} AND id > {ph} ORDER BY id LIMIT {ph}", (after_id or 0, limit))
                  
             predictions = []
-            if self.db_url:
-                for row in cursor.fetchall():
-                    pred = dict(row)
-                    if pred.get('prediction_json'):
-                        try:
-                            pred['prediction_data'] = json.loads(pred['prediction_json'])
-                        except:
-                            pred['prediction_data'] = {}
-                    predictions.append(pred)
-            else:
-                columns = [col[0] for col in cursor.description]
-                for row in cursor.fetchall():
-                    pred = dict(zip(columns, row))
-                    if pred.get('prediction_json'):
-                        try:
-                            pred['prediction_data'] = json.loads(pred['prediction_json'])
-                        except:
-                            pred['prediction_data'] = {}
-                    predictions.append(pred)
+            for prediction_id, match_id, league, market_type, selection, line, confidence in cursor.fetchall():
+                struc = {'market_type': market_type, 'selection': selection or ''}
+                if line is not None:
+                    struc['line'] = line
+                if confidence is not None:
+                    struc['confidence'] = confidence
+                predictions.append({
+                    'id': prediction_id, 'match_id': match_id, 'league': league, 'structured_prediction': struc
+                })
 
             conn.close()
             return predictions
@@ -304,6 +853,7 @@ class DatabaseService:
             conn = self._get_connection()
             cursor = conn.cursor()
             cursor.execute("DELETE FROM predictions")
+            cursor.execute("DELETE FROM prediction_counters")
             if self.db_url:
                 cursor.execute("UPDATE site_stats SET param_value = 0")
             else:
@@ -314,3 +864,350 @@ class DatabaseService:
         except Exception as e:
             print(f"Error resetting DB: {e}")
             return False
+
+    def get_history_chunks(self, league, start_day, end_day):
+        """Returns {day: [games]} for the stored chunks of a league between two YYYYMMDD days (inclusive)."""
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            ph = self._get_placeholder()
+            cursor.execute(
+                f"SELECT day, games_json FROM history_chunks WHERE league = {ph} AND day >= {ph} AND day <= {ph}",
+                (league, start_day, end_day)
+            )
+            chunks = {}
+            for day, games_json in cursor.fetchall():
+                try:
+                    chunks[day] = json.loads(games_json) if games_json else []
+                except ValueError:
+                    continue # Corrupt chunk, it will simply be fetched again
+            conn.close()
+            return chunks
+        except Exception as e:
+            print(f"DB Error fetching history chunks: {e}")
+            return {}
+
+    def save_history_chunks(self, league, chunks):
+        """Upserts {day: [games]} chunks for a league in one transaction."""
+        if not chunks:
+            return True
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            rows = [(league, day, json.dumps(games)) for day, games in chunks.items()]
+            if self.db_url:
+                cursor.executemany('''
+                    INSERT INTO history_chunks (league, day, games_json) VALUES (%s, %s, %s)
+                    ON CONFLICT (league, day) DO UPDATE SET games_json = EXCLUDED.games_json, fetched_at = CURRENT_TIMESTAMP
+                ''', rows)
+            else:
+                cursor.executemany(
+                    'INSERT OR REPLACE INTO history_chunks (league, day, games_json) VALUES (?, ?, ?)', rows
+                )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"DB Error saving history chunks: {e}")
+            return False
+
+    def save_event_index(self, entries):
+        """Upserts (event_id, league, event_date) rows in one transaction."""
+        if not entries:
+            return True
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            if self.db_url:
+                cursor.executemany('''
+                    INSERT INTO event_index (event_id, league, event_date) VALUES (%s, %s, %s)
+                    ON CONFLICT (event_id) DO UPDATE SET league = EXCLUDED.league, event_date = EXCLUDED.event_date
+                ''', entries)
+            else:
+                cursor.executemany(
+                    'INSERT OR REPLACE INTO event_index (event_id, league, event_date) VALUES (?, ?, ?)', entries
+                )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"DB Error saving event index: {e}")
+            return False
+
+    def get_event_index(self, event_ids):
+        """Returns {event_id: (league, event_date)} for the ids that are indexed."""
+        event_ids = [str(e) for e in event_ids if e]
+        if not event_ids:
+            return {}
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            ph = self._get_placeholder()
+            found = {}
+            # Chunked to stay under SQLite's bound-parameter limit
+            for i in range(0, len(event_ids), 500):
+                batch = event_ids[i:i + 500]
+                cursor.execute(
+                    f"SELECT event_id, league, event_date FROM event_index WHERE event_id IN ({', '.join([ph] * len(batch))})",
+                    batch
+                )
+                for event_id, league, event_date in cursor.fetchall():
+                    found[event_id] = (league, event_date)
+            conn.close()
+            return found
+        except Exception as e:
+            print(f"DB Error reading event index: {e}")
+            return {}
+
+    def _row_to_dict(self, cursor, row):
+        if row is None:
+            return None
+        if self.db_url:
+            return dict(row)
+        return dict(zip([col[0] for col in cursor.description], row))
+
+    def _dict_cursor(self, conn):
+        return conn.cursor(cursor_factory=RealDictCursor) if self.db_url else conn.cursor()
+
+    def create_grading_job(self):
+        """Queues a grading job, or returns the active one if a job is already queued/running."""
+        try:
+            conn = self._get_connection()
+            cursor = self._dict_cursor(conn)
+            ph = self._get_placeholder()
+            cursor.execute("SELECT * FROM grading_jobs WHERE status IN ('queued', 'running') ORDER BY id LIMIT 1")
+            active = self._row_to_dict(cursor, cursor.fetchone())
+            if active:
+                conn.close()
+                return active
+
+            now = time.time()
+            if self.db_url:
+                cursor.execute(f"INSERT INTO grading_jobs (status, created_at, updated_at) VALUES ('queued', {ph}, {ph}) RETURNING id", (now, now))
+                job_id = cursor.fetchone()['id']
+            else:
+                cursor.execute(f"INSERT INTO grading_jobs (status, created_at, updated_at) VALUES ('queued', {ph}, {ph})", (now, now))
+                job_id = cursor.lastrowid
+            conn.commit()
+            cursor.execute(f"SELECT * FROM grading_jobs WHERE id = {ph}", (job_id,))
+            job = self._row_to_dict(cursor, cursor.fetchone())
+            conn.close()
+            return job
+        except Exception as e:
+            print(f"DB Error creating grading job: {e}")
+            return None
+
+    def get_grading_job(self, job_id=None):
+        """Returns a grading job by id, or the most recent one when no id is given."""
+        try:
+            conn = self._get_connection()
+            cursor = self._dict_cursor(conn)
+            ph = self._get_placeholder()
+            if job_id is None:
+                cursor.execute("SELECT * FROM grading_jobs ORDER BY id DESC LIMIT 1")
+            else:
+                cursor.execute(f"SELECT * FROM grading_jobs WHERE id = {ph}", (job_id,))
+            job = self._row_to_dict(cursor, cursor.fetchone())
+            conn.close()
+            return job
+        except Exception as e:
+            print(f"DB Error fetching grading job: {e}")
+            return None
+
+    def claim_grading_job(self, stale_after=300, job_id=None):
+        """
+        Atomically moves the oldest queued job (or a running job whose worker stopped
+        heart-beating) to 'running' and returns it. Safe across gunicorn workers.
+        With job_id only that job is considered.
+        """
+        try:
+            conn = self._get_connection()
+            cursor = self._dict_cursor(conn)
+            ph = self._get_placeholder()
+            now = time.time()
+            query = f"SELECT * FROM grading_jobs WHERE (status = 'queued' OR (status = 'running' AND updated_at < {ph}))"
+            params = (now - stale_after,)
+            if job_id is not None:
+                query += f" AND id = {ph}"
+                params += (job_id,)
+            cursor.execute(query + " ORDER BY id LIMIT 1", params)
+            job = self._row_to_dict(cursor, cursor.fetchone())
+            if not job:
+                conn.close()
+                return None
+
+            cursor.execute(
+                f"UPDATE grading_jobs SET status = 'running', started_at = COALESCE(started_at, {ph}), updated_at = {ph} "
+                f"WHERE id = {ph} AND status = {ph} AND updated_at = {ph}",
+                (now, now, job['id'], job['status'], job['updated_at'])
+            )
+            claimed = cursor.rowcount == 1
+            conn.commit()
+            conn.close()
+            if not claimed:
+                return None # Another worker got there first
+            job.update({'status': 'running', 'started_at': job.get('started_at') or now, 'updated_at': now})
+            return job
+        except Exception as e:
+            print(f"DB Error claiming grading job: {e}")
+            return None
+
+    def update_grading_job(self, job_id, **fields):
+        """Updates progress columns of a grading job; also refreshes its heartbeat."""
+        allowed = {'status', 'total', 'processed', 'updated', 'last_id', 'error', 'finished_at'}
+        fields = {k: v for k, v in fields.items() if k in allowed}
+        fields['updated_at'] = time.time()
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            ph = self._get_placeholder()
+            assignments = ", ".join(f"{k} = {ph}" for k in fields)
+            cursor.execute(f"UPDATE grading_jobs SET {assignments} WHERE id = {ph}", tuple(fields.values()) + (job_id,))
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"DB Error updating grading job: {e}")
+            return False
+
+    def count_pending_predictions(self):
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM predictions WHERE (result IS NULL OR result = '') AND market_type IS NOT NULL")
+            count = cursor.fetchone()[0]
+            conn.close()
+            return count
+        except Exception as e:
+            print(f"DB Error counting pending: {e}")
+            return 0
+
+    def get_cached_prediction(self, cache_key):
+        """Returns the cached prediction dict if present and not expired."""
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            ph = self._get_placeholder()
+            cursor.execute(
+                f"SELECT prediction_json FROM prediction_cache WHERE cache_key = {ph} AND expires_at > {ph}",
+                (cache_key, time.time())
+            )
+            row = cursor.fetchone()
+            conn.close()
+            return json.loads(row[0]) if row and row[0] else None
+        except Exception as e:
+            print(f"DB Error reading prediction cache: {e}")
+            return None
+
+    def save_cached_prediction(self, cache_key, prediction, model, prompt_hash, expires_at):
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            ph = self._get_placeholder()
+            now = time.time()
+            # Expired entries are dead weight, drop them while we are here
+            cursor.execute(f"DELETE FROM prediction_cache WHERE expires_at <= {ph}", (now,))
+            row = (cache_key, json.dumps(prediction), model, prompt_hash, now, expires_at)
+            if self.db_url:
+                cursor.execute('''
+                    INSERT INTO prediction_cache (cache_key, prediction_json, model, prompt_hash, created_at, expires_at)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (cache_key) DO UPDATE SET prediction_json = EXCLUDED.prediction_json,
+                        created_at = EXCLUDED.created_at, expires_at = EXCLUDED.expires_at
+                ''', row)
+            else:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO prediction_cache (cache_key, prediction_json, model, prompt_hash, created_at, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', row)
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"DB Error saving prediction cache: {e}")
+            return False
+
+    def _prediction_job_from_row(self, cursor, row):
+        job = self._row_to_dict(cursor, row)
+        if job and job.get('result_json'):
+            try:
+                job['result'] = json.loads(job['result_json'])
+            except ValueError:
+                job['result'] = None
+        return job
+
+    def find_active_prediction_job(self, match_key, stale_after):
+        """Returns the newest queued/running job for a match, ignoring jobs whose worker went quiet."""
+        try:
+            conn = self._get_connection()
+            cursor = self._dict_cursor(conn)
+            ph = self._get_placeholder()
+            cursor.execute(
+                f"SELECT * FROM prediction_jobs WHERE match_key = {ph} AND status IN ('queued', 'running') "
+                f"AND updated_at > {ph} ORDER BY created_at DESC LIMIT 1",
+                (match_key, time.time() - stale_after)
+            )
+            job = self._prediction_job_from_row(cursor, cursor.fetchone())
+            conn.close()
+            return job
+        except Exception as e:
+            print(f"DB Error finding prediction job: {e}")
+            return None
+
+    def create_prediction_job(self, job_id, match_key):
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            ph = self._get_placeholder()
+            now = time.time()
+            cursor.execute(
+                f"INSERT INTO prediction_jobs (job_id, match_key, status, created_at, updated_at) VALUES ({ph}, {ph}, 'queued', {ph}, {ph})",
+                (job_id, match_key, now, now)
+            )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"DB Error creating prediction job: {e}")
+            return False
+
+    def update_prediction_job(self, job_id, status, result=None, error=None):
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            ph = self._get_placeholder()
+            cursor.execute(
+                f"UPDATE prediction_jobs SET status = {ph}, result_json = {ph}, error = {ph}, updated_at = {ph} WHERE job_id = {ph}",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            print(f"DB Error updating prediction job: {e}")
+            return False
+
+    def get_prediction_job(self, job_id):
+        try:
+            conn = self._get_connection()
+            cursor = self._dict_cursor(conn)
+            ph = self._get_placeholder()
+            cursor.execute(f"SELECT * FROM prediction_jobs WHERE job_id = {ph}", (job_id,))
+            job = self._prediction_job_from_row(cursor, cursor.fetchone())
+            conn.close()
+            return job
+        except Exception as e:
+            print(f"DB Error fetching prediction job: {e}")
+            return None
+
+
+if __name__ == '__main__':
+    # Maintenance entry point: python -m services.database_service rebuild-counters
+    import sys
+
+    if sys.argv[1:] == ['rebuild-counters']:
+        ok = DatabaseService().rebuild_counters()
+        print("Counters rebuilt" if ok else "Counter rebuild failed")
+        sys.exit(0 if ok else 1)
+    print("usage: python -m services.database_service rebuild-counters")
+    sys.exit(2)
@@ -0,0 +1,152 @@
+import collections
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became free within the pool timeout."""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a DB-API connection. close() hands the connection back to
+    its pool instead of closing it, so existing `conn.close()` call sites keep working.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __del__(self):
+        # Error paths that never reach close() must not shrink the pool
+        if getattr(self, '_conn', None) is not None:
+            self._pool.release(self._conn, reclaimed=True)
+            self._conn = None
+
+
+class ConnectionPool:
+    """
+    Fixed-size, thread-safe connection pool. Connections are created lazily up
+    to `size`; callers wait up to `timeout` seconds for one to be returned.
+    Idle connections are pinged before reuse once they have been idle for
+    `check_after` seconds, and broken ones are replaced transparently.
+    """
+
+    def __init__(self, connect, size=10, timeout=10.0, check_after=30.0, ping=None, is_broken=None):
+        self._connect = connect
+        self._ping = ping or (lambda conn: conn.cursor().execute("SELECT 1"))
+        self._is_broken = is_broken or (lambda conn: False)
+        self.size = size
+        self.timeout = timeout
+        self.check_after = check_after
+        # (connection, idle since) pairs, most recently returned last
+        self._idle = collections.deque()
+        # Re-entrant: a proxy reclaimed by the GC may release while this thread holds the lock
+        self._cond = threading.Condition(threading.RLock())
+        self._created = 0
+        self._in_use = 0
+        self.stats = {
+            "acquired": 0, "waited": 0, "timeouts": 0, "connects": 0, "health_checks": 0,
+            "discarded": 0, "reclaimed": 0, "max_in_use": 0, "total_wait_seconds": 0.0
+        }
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.stats["connects"] += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._created -= 1
+            self.stats["discarded"] += 1
+            self._cond.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        conn = idle_since = None
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s (pool size {self.size})")
+                if not waited:
+                    self.stats["waited"] += 1
+                    waited = True
+                self._cond.wait(remaining)
+
+        if conn is None:
+            conn = self._open()
+        elif time.monotonic() - idle_since >= self.check_after:
+            # Idle long enough to have been dropped server-side, make sure it still answers
+            with self._cond:
+                self.stats["health_checks"] += 1
+            try:
+                self._ping(conn)
+            except Exception:
+                self._discard(conn)
+                with self._cond:
+                    self._created += 1
+                conn = self._open()
+
+        with self._cond:
+            self._in_use += 1
+            self.stats["acquired"] += 1
+            self.stats["max_in_use"] = max(self.stats["max_in_use"], self._in_use)
+            self.stats["total_wait_seconds"] += time.monotonic() - started
+        return PooledConnection(self, conn)
+
+    def release(self, conn, reclaimed=False):
+        with self._cond:
+            self._in_use -= 1
+            if reclaimed:
+                self.stats["reclaimed"] += 1
+        try:
+            # Never hand the next caller a half-finished transaction
+            conn.rollback()
+            if self._is_broken(conn):
+                raise ValueError("connection is closed")
+        except Exception:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self.stats)
+            stats["size"] = self.size
+            stats["open"] = self._created
+            stats["in_use"] = self._in_use
+            stats["idle"] = len(self._idle)
+            stats["avg_wait_ms"] = round(stats["total_wait_seconds"] * 1000 / stats["acquired"], 3) if stats["acquired"] else 0
+            stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 3)
+        return stats
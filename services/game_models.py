@@ -0,0 +1,108 @@
+import sys
+
+# Team names, logos and status strings repeat across thousands of games, so they
+# are interned. League codes/names come from LEAGUES_CONFIG literals and short
+# score strings are already shared, so those are stored as given.
+_intern = sys.intern
+
+
+class _Record:
+    """
+    Base for compact slotted records. Besides attribute access they keep the
+    mapping interface the game dicts had (game['home_team']['name'], .get(),
+    `in`), so templates, the refresher and older callers work unchanged.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            return default
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return self.__slots__
+
+    def __eq__(self, other):
+        if not isinstance(other, type(self)):
+            return NotImplemented
+        return all(getattr(self, k) == getattr(other, k) for k in self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={getattr(self, k)!r}' for k in self.__slots__)})"
+
+
+class Team(_Record):
+    __slots__ = ('name', 'logo', 'score', 'winner')
+
+    def __init__(self, name, logo='', score='0', winner=False):
+        self.name = _intern(name) if type(name) is str else name
+        self.logo = _intern(logo) if type(logo) is str else logo
+        self.score = score
+        self.winner = winner
+
+    def to_dict(self):
+        return {'name': self.name, 'logo': self.logo, 'score': self.score, 'winner': self.winner}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('name'), data.get('logo', ''), data.get('score', '0'), data.get('winner', False))
+
+
+class Game(_Record):
+    """One scoreboard event as served by SportsService (see _process_event)."""
+
+    __slots__ = ('id', 'date', 'status', 'status_detail', 'home_team', 'away_team', 'league', 'league_name')
+
+    def __init__(self, id, date, status, status_detail, home_team, away_team, league, league_name):
+        self.id = id
+        self.date = date
+        self.status = _intern(status) if type(status) is str else status
+        self.status_detail = _intern(status_detail) if type(status_detail) is str else status_detail
+        self.home_team = home_team
+        self.away_team = away_team
+        self.league = league
+        self.league_name = league_name
+
+    def to_dict(self):
+        """Plain dict in the original game shape, for JSON responses and the history store."""
+        return {
+            'id': self.id,
+            'date': self.date,
+            'status': self.status,
+            'status_detail': self.status_detail,
+            'home_team': self.home_team.to_dict(),
+            'away_team': self.away_team.to_dict(),
+            'league': self.league,
+            'league_name': self.league_name
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['id'], data['date'], data['status'], data.get('status_detail'),
+            Team.from_dict(data['home_team']), Team.from_dict(data['away_team']),
+            data.get('league'), data.get('league_name')
+        )
+
+
+class GameList(list):
+    """
+    Games returned by SportsService.get_games. `missing_leagues` names the leagues
+    of an 'all' aggregation that errored or missed the fan-out deadline, so callers
+    can tell a partial result from a complete one.
+    """
+
+    def __init__(self, games=()):
+        super().__init__(games)
+        self.missing_leagues = []
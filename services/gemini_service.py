@@ -1,9 +1,26 @@
 import os
+import hashlib
+import re
+import time
+from datetime import datetime
 from google import genai
+from google.genai import types
 import json
+from services.rate_limiter import llm_gate, RateLimitExceeded
 
 class GeminiService:
-    def __init__(self):
+    MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+    # How long a cached prediction is served, and how long before kickoff it must expire
+    CACHE_TTL = int(os.getenv("PREDICTION_CACHE_TTL", 6 * 3600))
+    CACHE_KICKOFF_MARGIN = int(os.getenv("PREDICTION_CACHE_KICKOFF_MARGIN", 0))
+    # Matches sent to the LLM in one batch prompt
+    BATCH_SIZE = int(os.getenv("PREDICTION_BATCH_SIZE", 10))
+    BATCH_QUEUE_TIMEOUT = float(os.getenv("PREDICTION_BATCH_QUEUE_TIMEOUT", 300))
+
+    _default_db = None
+
+    def __init__(self, db_service=None):
+        self._db_service = db_service
         self.api_key = os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             print("Error: GEMINI_API_KEY not set in environment variables.")
@@ -15,29 +32,181 @@ class GeminiService:
         print(f"DEBUG: Gemini Client initialized with Key: {masked_key}")
         
         try:
-            self.client = genai.Client(api_key=self.api_key)
+            base_url = os.getenv("GEMINI_BASE_URL")
+            if base_url:
+                # e.g. the local stand-in used by benchmarks/loadtest.py
+                self.client = genai.Client(api_key=self.api_key, http_options=types.HttpOptions(base_url=base_url))
+            else:
+                self.client = genai.Client(api_key=self.api_key)
         except Exception as e:
             print(f"Error configuring Gemini Client: {e}")
             self.client = None
 
-    def _load_prompt(self):
+    @staticmethod
+    def _parse_json(text):
+        # Clean up response to ensure valid JSON parsing
+        clean_text = text.strip()
+        if clean_text.startswith("```json"):
+            clean_text = clean_text[7:]
+        if clean_text.startswith("```"): # Handle case where lang is not specified
+            clean_text = clean_text[3:] 
+        if clean_text.endswith("```"):
+            clean_text = clean_text[:-3]
+        return json.loads(clean_text)
+
+    def _generate(self, prompt, timeout=None):
+        # Every Gemini call goes through the process-wide rate/concurrency gate
+        return llm_gate.call(
+            lambda: self.client.models.generate_content(model=self.MODEL_NAME, contents=prompt),
+            timeout=timeout
+        )
+
+    # Fields pulled out of the partial JSON while a streamed prediction is still arriving
+    _STRING_FIELD_RE = {
+        field: re.compile(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % field)
+        for field in ('match', 'best_pick', 'safer_alternative')
+    }
+    _REASONING_START_RE = re.compile(r'"reasoning"\s*:\s*\[')
+    _ARRAY_STRING_RE = re.compile(r'\s*"((?:[^"\\]|\\.)*)"\s*(,|\])')
+
+    def _partial_fields(self, text, sent, reasoning_sent):
+        """Yields (event, data) for fields that became complete in the partial text."""
+        for field, pattern in self._STRING_FIELD_RE.items():
+            if field in sent:
+                continue
+            match = pattern.search(text)
+            if match:
+                sent.add(field)
+                yield field, json.loads(f'"{match.group(1)}"')
+
+        start = self._REASONING_START_RE.search(text)
+        if start:
+            pos, items = start.end(), []
+            while True:
+                match = self._ARRAY_STRING_RE.match(text, pos)
+                if not match:
+                    break
+                items.append(json.loads(f'"{match.group(1)}"'))
+                pos = match.end()
+                if match.group(2) == ']':
+                    break
+            for item in items[len(reasoning_sent):]:
+                reasoning_sent.append(item)
+                yield 'reasoning', item
+
+    def stream_prediction(self, home_team, away_team, league, event_id=None):
+        """
+        Generator of (event, data) pairs for server-sent events: partial fields
+        ('match', 'best_pick', 'reasoning', 'safer_alternative') as soon as they parse,
+        then 'final' with the full prediction or 'error'.
+        """
+        prompt_template = self._load_prompt()
+        if not prompt_template:
+            yield 'error', {"error": "Prompt template not loaded"}
+            return
+
+        prompt_hash = self._prompt_hash(prompt_template)
+        cache_key = self._cache_key(home_team, away_team, league, event_id, prompt_hash)
+        cached = self.db.get_cached_prediction(cache_key)
+        if cached:
+            yield 'final', cached
+            return
+
+        if not self.client:
+            yield 'error', {"error": "Gemini API not configured or key missing."}
+            return
+
+        prompt = prompt_template.format(home=home_team, away=away_team, league=league)
+        text = ""
+        sent, reasoning_sent = set(), []
         try:
-            prompt_path = os.path.join(os.path.dirname(__file__), '..', 'prompts', 'prediction_prompt.txt')
+            with llm_gate.slot():
+                for chunk in self.client.models.generate_content_stream(model=self.MODEL_NAME, contents=prompt):
+                    if not chunk.text:
+                        continue
+                    text += chunk.text
+                    for event in self._partial_fields(text, sent, reasoning_sent):
+                        yield event
+
+            if not text:
+                yield 'error', {"error": "Empty response from AI"}
+                return
+            prediction = self._parse_json(text)
+        except RateLimitExceeded:
+            yield 'error', {"error": "AI is currently busy (Rate Limit Exceeded). Please try again in a minute."}
+            return
+        except Exception as e:
+            error_msg = str(e)
+            if "429" in error_msg:
+                yield 'error', {"error": "AI is currently busy (Rate Limit Exceeded). Please try again in a minute."}
+                return
+            print(f"Gemini Streaming Prediction Error: {e}")
+            yield 'error', {"error": f"AI Generation failed: {error_msg}"}
+            return
+
+        self.db.save_cached_prediction(cache_key, prediction, self.MODEL_NAME, prompt_hash, self._cache_expiry(event_id))
+        yield 'final', prediction
+
+    def get_limiter_stats(self):
+        return llm_gate.get_stats()
+
+    def _load_prompt(self, name='prediction_prompt.txt'):
+        try:
+            prompt_path = os.path.join(os.path.dirname(__file__), '..', 'prompts', name)
             with open(prompt_path, 'r') as f:
                 return f.read()
         except Exception as e:
             print(f"Error loading prompt: {e}")
             return ""
 
-    def get_prediction(self, home_team, away_team, league):
-        if not self.client:
-            return {"error": "Gemini API not configured or key missing."}
+    @property
+    def db(self):
+        if self._db_service is None:
+            if GeminiService._default_db is None:
+                from services.database_service import DatabaseService
+                GeminiService._default_db = DatabaseService()
+            self._db_service = GeminiService._default_db
+        return self._db_service
 
+    @staticmethod
+    def _prompt_hash(prompt_template):
+        return hashlib.sha256(prompt_template.encode('utf-8')).hexdigest()[:16]
+
+    def _cache_key(self, home_team, away_team, league, event_id, prompt_hash):
+        match_key = f"event:{event_id}" if event_id else f"teams:{home_team}|{away_team}|{league}".lower()
+        return f"{match_key}:{prompt_hash}:{self.MODEL_NAME}"
+
+    def _cache_expiry(self, event_id):
+        now = time.time()
+        expires_at = now + self.CACHE_TTL
+        if event_id:
+            # Kickoff comes from the event index SportsService fills on every scoreboard fetch
+            entry = self.db.get_event_index([event_id]).get(str(event_id))
+            if entry and entry[1]:
+                try:
+                    kickoff = datetime.fromisoformat(entry[1].replace('Z', '+00:00')).timestamp()
+                    if kickoff - self.CACHE_KICKOFF_MARGIN > now:
+                        expires_at = min(expires_at, kickoff - self.CACHE_KICKOFF_MARGIN)
+                except ValueError:
+                    pass
+        return expires_at
+
+    def get_prediction(self, home_team, away_team, league, event_id=None):
         # Load prompt on every call to support hot-reloading of prompt file
         prompt_template = self._load_prompt()
         if not prompt_template:
             return {"error": "Prompt template not loaded"}
 
+        # Same match, prompt and model: serve the stored prediction without calling the LLM
+        prompt_hash = self._prompt_hash(prompt_template)
+        cache_key = self._cache_key(home_team, away_team, league, event_id, prompt_hash)
+        cached = self.db.get_cached_prediction(cache_key)
+        if cached:
+            return cached
+
+        if not self.client:
+            return {"error": "Gemini API not configured or key missing."}
+
         prompt = prompt_template.format(
             home=home_team,
             away=away_team,
@@ -46,27 +215,78 @@ class GeminiService:
 
         try:
             # Using gemini-2.0-flash as primary, falling back if needed (though flash is usually standard now)
-            response = self.client.models.generate_content(
-                model='gemini-2.0-flash',
-                contents=prompt
-            )
+            response = self._generate(prompt)
             
             if not response.text:
                  return {"error": "Empty response from AI"}
 
-            # Clean up response to ensure valid JSON parsing
-            clean_text = response.text.strip()
-            if clean_text.startswith("```json"):
-                clean_text = clean_text[7:]
-            if clean_text.startswith("```"): # Handle case where lang is not specified
-                clean_text = clean_text[3:] 
-            if clean_text.endswith("```"):
-                clean_text = clean_text[:-3]
-            
-            return json.loads(clean_text)
+            prediction = self._parse_json(response.text)
+            self.db.save_cached_prediction(cache_key, prediction, self.MODEL_NAME, prompt_hash, self._cache_expiry(event_id))
+            return prediction
+        except RateLimitExceeded:
+            return {"error": "AI is currently busy (Rate Limit Exceeded). Please try again in a minute."}
         except Exception as e:
             error_msg = str(e)
             if "429" in error_msg:
                 return {"error": "AI is currently busy (Rate Limit Exceeded). Please try again in a minute."}
             print(f"Gemini Prediction Error: {e}")
             return {"error": f"AI Generation failed: {error_msg}"}
+
+    def get_batch_predictions(self, fixtures):
+        """
+        Predicts many matches with one LLM call per BATCH_SIZE fixtures.
+        fixtures: list of {'event_id', 'home', 'away', 'league'}.
+        Results are stored in the prediction cache under the same key an interactive
+        get_prediction() for that match uses, so later clicks are cache hits.
+        Returns {event_id: prediction} for every fixture that has one (cached or new).
+        """
+        single_template = self._load_prompt()
+        batch_template = self._load_prompt('batch_prediction_prompt.txt')
+        if not single_template or not batch_template:
+            return {}
+
+        prompt_hash = self._prompt_hash(single_template)
+        predictions = {}
+        todo = []
+        for fx in fixtures:
+            event_id = str(fx['event_id'])
+            cached = self.db.get_cached_prediction(
+                self._cache_key(fx['home'], fx['away'], fx['league'], event_id, prompt_hash)
+            )
+            if cached:
+                predictions[event_id] = cached
+            else:
+                todo.append(fx)
+
+        if not self.client:
+            return predictions
+
+        for i in range(0, len(todo), self.BATCH_SIZE):
+            batch = todo[i:i + self.BATCH_SIZE]
+            lines = "\n".join(f"{fx['event_id']} | {fx['home']} vs {fx['away']} | {fx['league']}" for fx in batch)
+            try:
+                # Background job, so it can afford to queue longer than an interactive click
+                response = self._generate(batch_template.format(fixtures=lines), timeout=self.BATCH_QUEUE_TIMEOUT)
+                items = self._parse_json(response.text or "[]")
+            except Exception as e:
+                print(f"Gemini Batch Prediction Error: {e}")
+                continue
+            if not isinstance(items, list):
+                print("Gemini Batch Prediction Error: response is not a JSON array")
+                continue
+
+            by_id = {str(item.get('event_id')): item for item in items if isinstance(item, dict)}
+            for pos, fx in enumerate(batch):
+                event_id = str(fx['event_id'])
+                item = by_id.get(event_id)
+                if item is None and len(items) == len(batch) and isinstance(items[pos], dict) and 'event_id' not in items[pos]:
+                    item = items[pos] # Model dropped the id but kept the order
+                if not item or 'best_pick' not in item:
+                    continue
+                item.pop('event_id', None)
+                predictions[event_id] = item
+                self.db.save_cached_prediction(
+                    self._cache_key(fx['home'], fx['away'], fx['league'], event_id, prompt_hash),
+                    item, self.MODEL_NAME, prompt_hash, self._cache_expiry(event_id)
+                )
+        return predictions
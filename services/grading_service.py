@@ -0,0 +1,358 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from services import async_fanout
+
+
+def grade_prediction(struc, game_result):
+    """
+    Grades a structured prediction against a finished game
+    ({'home_score', 'away_score', 'winner'}). Returns 'Win', 'Loss' or 'Void'.
+    """
+    h_score = game_result.get('home_score', 0)
+    a_score = game_result.get('away_score', 0)
+
+    # Determine result based on market type
+    result = 'Void'
+    market_type = struc.get('market_type')
+
+    if market_type == 'moneyline' or struc.get('type') == 'winner':
+        actual_winner = game_result.get('winner')  # 'home', 'away', 'draw'
+        selection = struc.get('selection', struc.get('target', '')).lower()
+
+        if selection == actual_winner:
+            result = 'Win'
+        elif actual_winner == 'draw':
+            result = 'Win' if selection == 'draw' else 'Loss'
+        else:
+            result = 'Loss'
+
+    elif market_type == 'over_under':
+        total = h_score + a_score
+        line = float(struc.get('line', 0))
+        direction = struc.get('selection', '').lower()
+
+        if direction == 'over':
+            result = 'Win' if total > line else 'Loss'
+        elif direction == 'under':
+            result = 'Win' if total < line else 'Loss'
+
+    elif market_type == 'double_chance':
+        actual_winner = game_result.get('winner')
+        sel = struc.get('selection', '').upper()
+
+        if sel == '1X':
+            result = 'Win' if actual_winner in ['home', 'draw'] else 'Loss'
+        elif sel == 'X2':
+            result = 'Win' if actual_winner in ['away', 'draw'] else 'Loss'
+        elif sel == '12':
+            result = 'Win' if actual_winner in ['home', 'away'] else 'Loss'
+
+    return result
+
+
+class GradingService:
+    """
+    Grades pending predictions in batches: predictions are grouped by league and
+    kickoff date, each group's final scores come from ONE scoreboard range call,
+    and grading happens in memory. Predictions whose kickoff date is unknown, or
+    whose event a fetched range did not contain, fall back to the per-event
+    summary lookup. Predictions in a range that failed to load stay pending.
+    """
+
+    # Widest kickoff-date span fetched in a single scoreboard range call
+    MAX_RANGE_DAYS = int(os.getenv("GRADING_RANGE_DAYS", 14))
+    # Pending predictions graded per job step
+    BATCH_SIZE = int(os.getenv("GRADING_BATCH_SIZE", 200))
+    # Graded results written per transaction
+    FLUSH_SIZE = int(os.getenv("GRADING_FLUSH_SIZE", 100))
+    # Deadline for each chunk of per-event fallback lookups; keep it well under GradingWorker.STALE_AFTER
+    LOOKUP_TIMEOUT = float(os.getenv("GRADING_LOOKUP_TIMEOUT", 120))
+    # Wall-clock budget and batch size when a request thread grades inline (no worker)
+    INLINE_BUDGET = float(os.getenv("GRADING_INLINE_BUDGET", 8))
+    INLINE_BATCH_SIZE = int(os.getenv("GRADING_INLINE_BATCH_SIZE", 20))
+
+    def __init__(self, sports_service, db_service):
+        self.sports_service = sports_service
+        self.db_service = db_service
+
+    def grade_pending(self, pending=None, heartbeat=None, deadline=None):
+        """
+        Grades the given (or all) pending predictions and returns how many were
+        written. `heartbeat()` is called between lookup chunks and result flushes
+        so a long batch keeps its job claimed. With a `deadline` (epoch seconds)
+        lookups are cut short at it and whatever they missed stays pending.
+        """
+        heartbeat = heartbeat or (lambda: None)
+        if pending is None:
+            pending = self.db_service.get_pending_predictions()
+        if not pending:
+            return 0
+
+        gradable = []
+        for pred in pending:
+            struc = pred.get('structured_prediction')
+            if struc and pred.get('match_id'):
+                gradable.append((pred, struc))
+
+        index = self.sports_service.lookup_events([p['match_id'] for p, _ in gradable])
+        results, failed = self._fetch_batched_results(gradable, index, deadline)
+        heartbeat()
+
+        # Not covered by a batch (unknown kickoff date or moved fixture), look those up individually.
+        # A failed range is retried by the next run rather than fanned out one request per event.
+        unresolved = [
+            pred for pred, _ in gradable
+            if str(pred['match_id']) not in results and str(pred['match_id']) not in failed
+        ]
+        if failed:
+            print(f"Leaving {len(failed)} matches pending, their results could not be fetched")
+        results.update(self._fetch_single_results(unresolved, index, heartbeat, deadline))
+
+        updated_count = 0
+        graded = []
+        for pred, struc in gradable:
+            game_result = results.get(str(pred['match_id']))
+            if not game_result or game_result.get('status') != 'post':
+                continue # Game not finished yet
+
+            try:
+                result = grade_prediction(struc, game_result)
+            except Exception as e:
+                print(f"Error grading prediction {pred.get('id')}: {e}")
+                continue
+
+            graded.append((pred, result, game_result))
+            if len(graded) >= self.FLUSH_SIZE:
+                updated_count += self._write_results(graded)
+                graded = []
+                heartbeat()
+
+        return updated_count + self._write_results(graded)
+
+    def _write_results(self, graded):
+        """Writes a chunk of (prediction, result, game_result) in one transaction."""
+        if not graded:
+            return 0
+        written = self.db_service.update_prediction_results([(pred['id'], result) for pred, result, _ in graded])
+        if written:
+            for pred, result, game_result in graded:
+                print(f"✓ Graded {pred['match_id']}: {result} (Score: {game_result.get('home_score')}-{game_result.get('away_score')})")
+        return written
+
+    def _fetch_batched_results(self, gradable, index, deadline=None):
+        """
+        Returns ({match_id: result}, failed) where `failed` holds the match ids of
+        ranges whose scoreboard call raised or missed the fan-out deadline.
+        """
+        # league -> kickoff day -> match ids
+        days_by_league = {}
+        for pred, _ in gradable:
+            match_id = str(pred['match_id'])
+            entry = index.get(match_id)
+            if not entry or not entry[1]:
+                continue
+            league, event_date = entry
+            try:
+                day = datetime.strptime(event_date[:10], "%Y-%m-%d")
+            except ValueError:
+                continue
+            days_by_league.setdefault(league, {}).setdefault(day, set()).add(match_id)
+
+        groups = []
+        match_ids_by_group = {}
+        for league, days in days_by_league.items():
+            window = []
+            for day in sorted(days):
+                if window and (day - window[0]).days > self.MAX_RANGE_DAYS:
+                    groups.append((league, window[0], window[-1]))
+                    window = []
+                window.append(day)
+                match_ids_by_group.setdefault((league, window[0]), set()).update(days[day])
+            if window:
+                groups.append((league, window[0], window[-1]))
+
+        def fetch_group(group):
+            league, start, end = group
+            # ESPN buckets by local day, pad a day each side so UTC edge kickoffs are included
+            dates = f"{(start - timedelta(days=1)).strftime('%Y%m%d')}-{(end + timedelta(days=1)).strftime('%Y%m%d')}"
+            return self.sports_service.get_finished_games(league, dates)
+
+        results = {}
+        failed = set()
+        timeout = self._time_left(deadline, async_fanout.FANOUT_TIMEOUT)
+        for group, group_results in async_fanout.map_blocking(fetch_group, groups, timeout=timeout):
+            if isinstance(group_results, Exception):
+                print(f"Error fetching results for {group[0]}: {group_results}")
+                failed.update(match_ids_by_group[group[:2]])
+                continue
+            results.update(group_results)
+        return results, failed
+
+    def _fetch_single_results(self, preds, index, heartbeat, deadline=None):
+        """Per-event lookups for predictions no batch covered, run concurrently on the fan-out loop."""
+        by_match = {}
+        for pred in preds:
+            by_match.setdefault(str(pred['match_id']), pred)
+        match_ids = list(by_match)
+
+        def fetch(match_id):
+            entry = index.get(match_id)
+            return self._fetch_single_result(by_match[match_id], entry[0] if entry else None)
+
+        results = {}
+        for start in range(0, len(match_ids), self.FLUSH_SIZE):
+            timeout = self._time_left(deadline, self.LOOKUP_TIMEOUT)
+            if timeout <= 0:
+                print(f"Grading budget spent, {len(match_ids) - start} lookups left for the next run")
+                break
+            chunk = match_ids[start:start + self.FLUSH_SIZE]
+            for match_id, game_result in async_fanout.map_blocking(fetch, chunk, timeout=timeout):
+                if isinstance(game_result, Exception):
+                    # Left pending, the next grading run retries it
+                    print(f"Error fetching result for {match_id}: {game_result}")
+                    continue
+                if game_result:
+                    results[match_id] = game_result
+            heartbeat()
+        return results
+
+    @staticmethod
+    def _time_left(deadline, timeout):
+        if deadline is None:
+            return timeout
+        return min(timeout, max(deadline - time.time(), 0))
+
+    def _fetch_single_result(self, pred, indexed_league=None):
+        match_id = pred['match_id']
+        league = indexed_league or pred.get('league')
+        if league in self.sports_service.LEAGUES_CONFIG:
+            return self.sports_service.get_finished_game(match_id, league)
+
+        # If league is 'all' or missing, we must search all leagues for this ID
+        for code in self.sports_service.LEAGUES_CONFIG.keys():
+            res = self.sports_service.get_finished_game(match_id, code)
+            if res:
+                return res
+        return None
+
+    def run_job(self, job, max_batches=None, budget=None, batch_size=None):
+        """
+        Works through the pending predictions of a claimed job in BATCH_SIZE (or
+        batch_size) keyset batches, persisting progress after each one so the job
+        can resume after a restart. With max_batches or a wall-clock budget in
+        seconds the job may be left 'queued' to continue later.
+        """
+        job_id = job['id']
+        last_id = job.get('last_id') or 0
+        processed = job.get('processed') or 0
+        updated = job.get('updated') or 0
+        if not job.get('total'):
+            self.db_service.update_grading_job(job_id, total=self.db_service.count_pending_predictions())
+
+        batch_size = batch_size or self.BATCH_SIZE
+        deadline = time.time() + budget if budget else None
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                if deadline is not None and batches and time.time() >= deadline:
+                    break
+                batch = self.db_service.get_pending_predictions(after_id=last_id, limit=batch_size)
+                if not batch:
+                    self.db_service.update_grading_job(job_id, status='done', finished_at=time.time())
+                    return True
+
+                updated += self.grade_pending(
+                    batch, heartbeat=lambda: self.db_service.update_grading_job(job_id), deadline=deadline
+                )
+                processed += len(batch)
+                last_id = max(p['id'] for p in batch)
+                batches += 1
+                self.db_service.update_grading_job(job_id, processed=processed, updated=updated, last_id=last_id)
+
+            # Out of budget for this call, hand the rest back to the queue
+            self.db_service.update_grading_job(job_id, status='queued')
+            return False
+        except Exception as e:
+            print(f"Grading job {job_id} failed: {e}")
+            self.db_service.update_grading_job(job_id, status='failed', error=str(e), finished_at=time.time())
+            return True
+
+    def get_job_status(self, job_id=None):
+        job = self.db_service.get_grading_job(job_id)
+        if not job:
+            return None
+        end = job.get('finished_at') or time.time()
+        elapsed = end - job['started_at'] if job.get('started_at') else 0
+        return {
+            "job_id": job['id'],
+            "status": job['status'],
+            "total": job.get('total') or 0,
+            "processed": job.get('processed') or 0,
+            "updated": job.get('updated') or 0,
+            "error": job.get('error'),
+            "elapsed_seconds": round(elapsed, 1),
+            "per_second": round((job.get('processed') or 0) / elapsed, 1) if elapsed > 0 else 0
+        }
+
+
+class GradingWorker:
+    """
+    Background thread that claims queued grading jobs from the DB and runs them.
+    Optionally enqueues a job on its own every SCHEDULE_INTERVAL seconds.
+    """
+
+    POLL_INTERVAL = int(os.getenv("GRADING_POLL_INTERVAL", 30))
+    SCHEDULE_INTERVAL = int(os.getenv("GRADING_SCHEDULE_INTERVAL", 0))
+    STALE_AFTER = int(os.getenv("GRADING_STALE_AFTER", 300))
+
+    def __init__(self, grading_service):
+        self.grading_service = grading_service
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_scheduled = time.time()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="grading-worker", daemon=True)
+            self._thread.start()
+            print("Grading worker started")
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _run(self):
+        db_service = self.grading_service.db_service
+        while True:
+            if self.SCHEDULE_INTERVAL and time.time() - self._last_scheduled >= self.SCHEDULE_INTERVAL:
+                self._last_scheduled = time.time()
+                db_service.create_grading_job()
+
+            job = db_service.claim_grading_job(stale_after=self.STALE_AFTER)
+            if job:
+                self.grading_service.run_job(job)
+                continue
+
+            self._wakeup.wait(self.POLL_INTERVAL)
+            self._wakeup.clear()
+
+
+if __name__ == '__main__':
+    # CLI / cron entry point: python -m services.grading_service
+    from services.database_service import DatabaseService
+    from services.sports_service import SportsService
+
+    db = DatabaseService()
+    service = GradingService(SportsService(db_service=db), db)
+    queued = db.create_grading_job()
+    job = db.claim_grading_job(stale_after=GradingWorker.STALE_AFTER)
+    if job:
+        service.run_job(job)
+        print(service.get_job_status(job['id']))
+    elif queued:
+        print(f"Grading job {queued['id']} is already being run by another worker")
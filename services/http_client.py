@@ -0,0 +1,109 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+
+# Sized to match the league fan-out so a full 'all' aggregation never waits on a socket
+POOL_SIZE = int(os.getenv("ESPN_POOL_SIZE", 20))
+CONNECT_TIMEOUT = float(os.getenv("ESPN_CONNECT_TIMEOUT", 3.05))
+READ_TIMEOUT = float(os.getenv("ESPN_READ_TIMEOUT", 10))
+# How long a request waits for a free pooled connection before failing, so a stalled upstream cannot park threads forever
+POOL_TIMEOUT = float(os.getenv("ESPN_POOL_TIMEOUT", 5))
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "errors": 0, "pool_timeouts": 0}
+
+
+class _PoolTimeoutMixin:
+    # requests never passes urllib3 a pool_timeout, which makes a blocking pool wait indefinitely
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(timeout=POOL_TIMEOUT if timeout is None else timeout)
+
+
+class _HTTPPool(_PoolTimeoutMixin, HTTPConnectionPool):
+    pass
+
+
+class _HTTPSPool(_PoolTimeoutMixin, HTTPSConnectionPool):
+    pass
+
+
+class _BoundedWaitAdapter(HTTPAdapter):
+    """Blocking connection pool whose waits for a free connection give up after POOL_TIMEOUT."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPPool, "https": _HTTPSPool}
+
+
+def get_session():
+    """Returns the process-wide pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = _BoundedWaitAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({
+                    "Accept": "application/json",
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive"
+                })
+                _session = session
+    return _session
+
+
+def get(url, params=None, timeout=None, **kwargs):
+    """
+    GET through the shared session with connect/read timeouts applied.
+    Raises like requests.get so callers keep their own error handling.
+    """
+    with _stats_lock:
+        _stats["requests"] += 1
+    try:
+        return get_session().get(url, params=params, timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT), **kwargs)
+    except Exception as e:
+        with _stats_lock:
+            _stats["errors"] += 1
+            if isinstance(e, EmptyPoolError):
+                _stats["pool_timeouts"] += 1
+        raise
+
+
+def get_stats():
+    """Connection reuse statistics aggregated over every urllib3 host pool."""
+    connections_opened = 0
+    pool_requests = 0
+    hosts = 0
+    if _session is not None:
+        seen = set()
+        for adapter in _session.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                hosts += 1
+                connections_opened += pool.num_connections
+                pool_requests += pool.num_requests
+
+    with _stats_lock:
+        stats = dict(_stats)
+    stats.update({
+        "pool_size": POOL_SIZE,
+        "hosts": hosts,
+        "connections_opened": connections_opened,
+        "connections_reused": max(pool_requests - connections_opened, 0),
+        "reuse_rate": round(1 - connections_opened / pool_requests, 3) if pool_requests else 0,
+        "timeouts": {"connect": CONNECT_TIMEOUT, "read": READ_TIMEOUT, "pool": POOL_TIMEOUT}
+    })
+    return stats
@@ -0,0 +1,148 @@
+import codecs
+import json
+import os
+import re
+
+# Read size for streamed responses; a buffer never holds much more than this plus one item
+CHUNK_SIZE = int(os.getenv("JSON_STREAM_CHUNK_SIZE", 256 * 1024))
+# Bodies smaller than this are parsed whole with json.loads: decoding item by item costs
+# ~1.5x more CPU, which only pays off when the parsed document would be large
+STREAM_MIN_BYTES = int(os.getenv("JSON_STREAM_MIN_BYTES", 1024 * 1024))
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_CHARS = '0123456789+-.eE'
+
+
+class _Reader:
+    """Text buffer over an iterator of byte (or str) chunks, refilled on demand."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Appends the next chunk, dropping the consumed prefix. False once input is exhausted."""
+        if self.eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.eof = True
+            text = self._utf8.decode(b'', final=True)
+        else:
+            text = chunk if isinstance(chunk, str) else self._utf8.decode(chunk)
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character without consuming it, '' at end of input."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ''
+
+    def take(self):
+        c = self.peek()
+        if not c:
+            raise ValueError("Unexpected end of JSON input")
+        self.pos += 1
+        return c
+
+    def expect(self, expected):
+        c = self.take()
+        if c != expected:
+            raise ValueError(f"Expected {expected!r} in JSON input, got {c!r}")
+
+    def value(self):
+        """Decodes one complete JSON value, reading more input until it is all buffered."""
+        while True:
+            self.peek()
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Incomplete value: read at least as much again before re-scanning, so a
+                # value spanning many chunks is decoded a few times, not once per chunk
+                target = 2 * (len(self.buf) - self.pos)
+                if not self.fill():
+                    raise
+                while len(self.buf) - self.pos < target and self.fill():
+                    pass
+                continue
+            # A number cut off at the buffer edge ("2." / "1e") decodes short, read on first
+            if type(obj) in (int, float):
+                tail = end
+                while tail < len(self.buf) and self.buf[tail] in _NUMBER_CHARS:
+                    tail += 1
+                if tail == len(self.buf) and self.fill():
+                    continue
+            self.pos = end
+            return obj
+
+
+def iter_array(chunks, key, min_bytes=None):
+    """
+    Yields the items of the array under the top-level `key` of a JSON object
+    read incrementally from `chunks`, decoding one item at a time. Other
+    top-level members are decoded and dropped, and reading stops at the end of
+    the array. Input that ends within `min_bytes` (STREAM_MIN_BYTES) is parsed
+    whole instead. Yields nothing when the key is missing or not an array;
+    raises ValueError on malformed or truncated input.
+    """
+    min_bytes = STREAM_MIN_BYTES if min_bytes is None else min_bytes
+    chunks = iter(chunks)
+    head = []
+    size = 0
+    for chunk in chunks:
+        head.append(chunk)
+        size += len(chunk)
+        if size >= min_bytes:
+            break
+    else:
+        # Small body, one json.loads is the cheapest way through it
+        data = json.loads(''.join(head) if head and isinstance(head[0], str) else b''.join(head))
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object")
+        items = data.get(key)
+        if isinstance(items, list):
+            yield from items
+        return
+
+    reader = _Reader(_chain(head, chunks))
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+
+    while True:
+        name = reader.value()
+        reader.expect(':')
+        if name == key and reader.peek() == '[':
+            reader.take()
+            if reader.peek() == ']':
+                return
+            while True:
+                yield reader.value()
+                c = reader.take()
+                if c == ']':
+                    return
+                if c != ',':
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {c!r}")
+
+        reader.value()
+        c = reader.take()
+        if c == '}':
+            return
+        if c != ',':
+            raise ValueError(f"Expected ',' or '}}' in JSON object, got {c!r}")
+
+
+def _chain(head, rest):
+    # Popped as they are handed on so the buffered head is not kept alive for the whole stream
+    while head:
+        yield head.pop(0)
+    yield from rest
@@ -0,0 +1,81 @@
+import concurrent.futures
+import os
+import threading
+import uuid
+
+
+class PredictionJobManager:
+    """
+    Runs predictions off the request thread on a small bounded pool. Jobs are
+    persisted in the DB so any worker can answer a poll, and a second submission
+    for a match that is already being predicted attaches to the running job.
+    """
+
+    MAX_WORKERS = int(os.getenv("PREDICTION_JOB_WORKERS", 4))
+    # A queued/running job not touched for this long is considered lost
+    STALE_AFTER = int(os.getenv("PREDICTION_JOB_STALE_AFTER", 120))
+
+    def __init__(self, gemini_service, db_service):
+        self.gemini_service = gemini_service
+        self.db_service = db_service
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.MAX_WORKERS, thread_name_prefix="prediction-job"
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def match_key(home, away, league, event_id):
+        return f"event:{event_id}" if event_id else f"teams:{home}|{away}|{league}".lower()
+
+    def submit(self, home, away, league, event_id=None, device='Unknown'):
+        match_key = self.match_key(home, away, league, event_id)
+        # The lock only closes the race inside this process; across workers the DB check
+        # still dedupes everything but truly simultaneous first submissions
+        with self._lock:
+            existing = self.db_service.find_active_prediction_job(match_key, self.STALE_AFTER)
+            if existing:
+                return self._status(existing)
+
+            job_id = uuid.uuid4().hex
+            if not self.db_service.create_prediction_job(job_id, match_key):
+                return None
+
+        match_data = {
+            "id": event_id if event_id else f"{home}-{away}-{league}",
+            "home_team": home,
+            "away_team": away,
+            "league": league,
+            "device": device
+        }
+        self._executor.submit(self._run, job_id, match_data, event_id)
+        return {"job_id": job_id, "status": "queued"}
+
+    def _run(self, job_id, match_data, event_id):
+        self.db_service.update_prediction_job(job_id, 'running')
+        try:
+            prediction = self.gemini_service.get_prediction(
+                match_data['home_team'], match_data['away_team'], match_data['league'], event_id=event_id
+            )
+        except Exception as e:
+            print(f"Prediction job {job_id} failed: {e}")
+            self.db_service.update_prediction_job(job_id, 'failed', error=str(e))
+            return
+
+        if prediction and 'error' not in prediction:
+            self.db_service.save_prediction(match_data, prediction)
+            self.db_service.update_prediction_job(job_id, 'done', result=prediction)
+        else:
+            self.db_service.update_prediction_job(job_id, 'failed', result=prediction, error=(prediction or {}).get('error'))
+
+    def get(self, job_id):
+        job = self.db_service.get_prediction_job(job_id)
+        return self._status(job) if job else None
+
+    @staticmethod
+    def _status(job):
+        status = {"job_id": job['job_id'], "status": job['status']}
+        if job['status'] == 'done':
+            status["result"] = job.get('result')
+        elif job['status'] == 'failed':
+            status["error"] = job.get('error') or "Prediction failed"
+        return status
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class PregenerationService:
+    """
+    Fills the prediction cache for upcoming fixtures ahead of kickoff using
+    batched LLM calls, so interactive predict clicks are mostly cache hits.
+    """
+
+    # Only fixtures kicking off within this many hours are pre-generated
+    HORIZON_HOURS = int(os.getenv("PREGEN_HORIZON_HOURS", 48))
+    INTERVAL = int(os.getenv("PREGEN_INTERVAL", 0))
+
+    def __init__(self, sports_service, gemini_service):
+        self.sports_service = sports_service
+        self.gemini_service = gemini_service
+        self._thread = None
+
+    def upcoming_fixtures(self, league='all'):
+        games = self.sports_service.get_games(league_code=league, type='upcoming')
+        if isinstance(games, dict):
+            games = games.get('upcoming', [])
+
+        horizon = time.time() + self.HORIZON_HOURS * 3600
+        fixtures = []
+        for game in games:
+            try:
+                kickoff = datetime.fromisoformat(game['date'].replace('Z', '+00:00'))
+                if kickoff.tzinfo is None:
+                    kickoff = kickoff.replace(tzinfo=timezone.utc)
+                if kickoff.timestamp() > horizon:
+                    continue
+            except (KeyError, ValueError):
+                continue
+            fixtures.append({
+                'event_id': game['id'],
+                'home': game['home_team']['name'],
+                'away': game['away_team']['name'],
+                'league': game['league']
+            })
+        return fixtures
+
+    def run(self, league='all'):
+        fixtures = self.upcoming_fixtures(league)
+        if not fixtures:
+            return {"fixtures": 0, "predicted": 0}
+        started = time.time()
+        predictions = self.gemini_service.get_batch_predictions(fixtures)
+        summary = {
+            "fixtures": len(fixtures),
+            "predicted": len(predictions),
+            "seconds": round(time.time() - started, 1)
+        }
+        print(f"Pre-generated predictions: {summary}")
+        return summary
+
+    def start(self):
+        """Re-runs pre-generation every INTERVAL seconds in a daemon thread (no-op when INTERVAL is 0)."""
+        if not self.INTERVAL or self._thread is not None:
+            return
+
+        def loop():
+            while True:
+                try:
+                    self.run()
+                except Exception as e:
+                    print(f"Pre-generation failed: {e}")
+                time.sleep(self.INTERVAL)
+
+        self._thread = threading.Thread(target=loop, name="prediction-pregen", daemon=True)
+        self._thread.start()
+        print("Prediction pre-generation scheduled")
+
+
+if __name__ == '__main__':
+    # CLI / cron entry point: python -m services.pregeneration_service [league]
+    import sys
+    from services.database_service import DatabaseService
+    from services.gemini_service import GeminiService
+    from services.sports_service import SportsService
+
+    db = DatabaseService()
+    service = PregenerationService(SportsService(db_service=db), GeminiService(db_service=db))
+    print(service.run(sys.argv[1] if len(sys.argv) > 1 else 'all'))
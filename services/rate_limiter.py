@@ -0,0 +1,158 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call could not get a slot before its deadline or the queue is full."""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, burst):
+        self.rate = rate_per_second
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline):
+        """Takes one token, waiting until it is available or the deadline (monotonic) passes."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate if self.rate > 0 else deadline - now
+                if now + wait > deadline:
+                    return False
+                self._cond.wait(wait)
+
+
+class LLMGate:
+    """
+    Process-wide gate in front of the Gemini client: a token bucket caps the
+    request rate, a semaphore caps concurrent generations, callers queue with a
+    deadline and 429 responses are retried with jittered exponential backoff.
+    """
+
+    RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", 60))
+    BURST = int(os.getenv("LLM_BURST", 10))
+    MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+    MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 50))
+    QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 20))
+    MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+    BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 1.0))
+    BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 16.0))
+
+    def __init__(self):
+        self._bucket = TokenBucket(self.RATE_PER_MINUTE / 60.0, self.BURST)
+        self._slots = threading.BoundedSemaphore(self.MAX_CONCURRENCY)
+        self._lock = threading.Lock()
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.stats = {
+            "calls": 0, "rejected_queue_full": 0, "rejected_deadline": 0,
+            "retries_429": 0, "failed_429": 0, "max_queue_depth": 0, "total_wait_seconds": 0.0
+        }
+
+    @staticmethod
+    def is_rate_limit_error(error):
+        return "429" in str(error) or "RESOURCE_EXHAUSTED" in str(error)
+
+    def _acquire(self, deadline):
+        with self._lock:
+            if self.queue_depth >= self.MAX_QUEUE:
+                self.stats["rejected_queue_full"] += 1
+                raise RateLimitExceeded("LLM queue is full")
+            self.queue_depth += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.queue_depth)
+
+        started = time.monotonic()
+        acquired = False
+        try:
+            if self._bucket.acquire(deadline):
+                acquired = self._slots.acquire(timeout=max(deadline - time.monotonic(), 0))
+        finally:
+            with self._lock:
+                self.queue_depth -= 1
+                self.stats["total_wait_seconds"] += time.monotonic() - started
+                if acquired:
+                    self.in_flight += 1
+                else:
+                    self.stats["rejected_deadline"] += 1
+        if not acquired:
+            raise RateLimitExceeded("Timed out waiting for an LLM slot")
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def call(self, fn, timeout=None):
+        """
+        Runs fn() once a rate token and a concurrency slot are free. timeout bounds
+        the total time spent queueing and backing off (defaults to LLM_QUEUE_TIMEOUT).
+        """
+        deadline = time.monotonic() + (self.QUEUE_TIMEOUT if timeout is None else timeout)
+        attempt = 0
+        while True:
+            self._acquire(deadline)
+            with self._lock:
+                self.stats["calls"] += 1
+            try:
+                return fn()
+            except Exception as e:
+                if not self.is_rate_limit_error(e):
+                    raise
+                backoff = random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * (2 ** attempt)))
+                if attempt >= self.MAX_RETRIES or time.monotonic() + backoff > deadline:
+                    with self._lock:
+                        self.stats["failed_429"] += 1
+                    raise
+                with self._lock:
+                    self.stats["retries_429"] += 1
+            finally:
+                self._release()
+            # Back off outside the slot so other callers are not blocked meanwhile
+            time.sleep(backoff)
+            attempt += 1
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """
+        Holds a rate token and a concurrency slot for the duration of the block.
+        Used for streaming generations, which cannot be transparently retried.
+        """
+        self._acquire(time.monotonic() + (self.QUEUE_TIMEOUT if timeout is None else timeout))
+        with self._lock:
+            self.stats["calls"] += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["queue_depth"] = self.queue_depth
+            stats["in_flight"] = self.in_flight
+            waited = stats["calls"] + stats["rejected_deadline"]
+            stats["avg_wait_seconds"] = round(stats["total_wait_seconds"] / waited, 3) if waited else 0
+            stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 3)
+            stats["limits"] = {
+                "rate_per_minute": self.RATE_PER_MINUTE, "burst": self.BURST,
+                "max_concurrency": self.MAX_CONCURRENCY, "max_queue": self.MAX_QUEUE
+            }
+        return stats
+
+
+# Shared by every GeminiService in the process
+llm_gate = LLMGate()
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from services import async_fanout
+
+
+class ScoreboardRefresher:
+    """
+    Keeps a warm snapshot of each (league, type) scoreboard and refreshes it in
+    a background thread. Page views are served from the snapshot
+    (stale-while-revalidate) so they never wait on ESPN once a league is warm.
+
+    Poll cadence is driven by the games themselves: leagues with a live game or
+    a kickoff inside KICKOFF_WINDOW are refreshed every HOT_INTERVAL seconds,
+    everything else every IDLE_INTERVAL seconds (or just before the next kickoff).
+
+    The loader raises when the upstream fetch fails. A failed refresh keeps the
+    previous snapshot and is retried from HOT_INTERVAL with exponential backoff;
+    a failed cold load is never cached and the error reaches the caller.
+    """
+
+    HOT_INTERVAL = int(os.getenv("SCOREBOARD_HOT_INTERVAL", 30))
+    IDLE_INTERVAL = int(os.getenv("SCOREBOARD_IDLE_INTERVAL", 900))
+    KICKOFF_WINDOW = int(os.getenv("SCOREBOARD_KICKOFF_WINDOW", 1800))
+    # Snapshots nobody asked for in this long stop being refreshed
+    IDLE_EXPIRY = int(os.getenv("SCOREBOARD_IDLE_EXPIRY", 3600))
+
+    def __init__(self, loader, timeouts=None):
+        # loader(league_code, type) -> list of processed games, raises if the fetch failed
+        self._loader = loader
+        # type -> fan-out deadline for refreshes of that type (default FANOUT_TIMEOUT)
+        self._timeouts = timeouts or {}
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread = None
+        self._running = False
+        # Types with a refresh fan-out in progress; each type runs its own so a slow one never delays the others
+        self._busy_types = set()
+        self.stats = {"cold_loads": 0, "fresh_hits": 0, "stale_hits": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="scoreboard-refresher", daemon=True)
+            self._thread.start()
+        print("Scoreboard refresher started")
+
+    def stop(self):
+        with self._wakeup:
+            self._running = False
+            self._wakeup.notify_all()
+
+    def get(self, league_code, type):
+        key = (league_code, type)
+        now = time.time()
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                snapshot['last_access'] = now
+                if snapshot['due_at'] <= now:
+                    # Serve stale, refresh in the background
+                    self.stats["stale_hits"] += 1
+                    snapshot['due_at'] = now
+                    self._wakeup.notify_all()
+                else:
+                    self.stats["fresh_hits"] += 1
+                return list(snapshot['games'])
+            self.stats["cold_loads"] += 1
+
+        # First request for this league pays for the fetch once (errors propagate, nothing is stored)
+        games = self._loader(league_code, type)
+        self._store(key, games, last_access=now)
+        return list(games)
+
+    def _store(self, key, games, last_access=None):
+        now = time.time()
+        with self._lock:
+            previous = self._snapshots.get(key, {})
+            self._snapshots[key] = {
+                'games': games,
+                'fetched_at': now,
+                'due_at': now + self._next_interval(games, now),
+                'last_access': last_access or previous.get('last_access', now)
+            }
+
+    def _store_failure(self, key):
+        now = time.time()
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                return
+            # Keep serving the last good games; retry soon, backing off while upstream stays down
+            snapshot['failures'] = snapshot.get('failures', 0) + 1
+            snapshot['due_at'] = now + min(self.HOT_INTERVAL * 2 ** (snapshot['failures'] - 1), self.IDLE_INTERVAL)
+
+    def _next_interval(self, games, now):
+        next_kickoff = None
+        for game in games:
+            if game['status'] == 'in':
+                return self.HOT_INTERVAL
+            if game['status'] != 'pre':
+                continue
+            kickoff = self._parse_date(game['date'])
+            if kickoff is None:
+                continue
+            if next_kickoff is None or kickoff < next_kickoff:
+                next_kickoff = kickoff
+
+        if next_kickoff is None:
+            return self.IDLE_INTERVAL
+
+        until_kickoff = next_kickoff - now
+        if until_kickoff <= self.KICKOFF_WINDOW:
+            return self.HOT_INTERVAL
+        # Sleep until the kickoff window opens, but never longer than the idle cadence
+        return max(self.HOT_INTERVAL, min(self.IDLE_INTERVAL, until_kickoff - self.KICKOFF_WINDOW))
+
+    @staticmethod
+    def _parse_date(iso_date_str):
+        try:
+            dt = datetime.fromisoformat(iso_date_str.replace('Z', '+00:00'))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return dt.timestamp()
+        except Exception:
+            return None
+
+    def _due_keys(self, now):
+        due = []
+        next_due = None
+        for key, snapshot in list(self._snapshots.items()):
+            if now - snapshot['last_access'] > self.IDLE_EXPIRY:
+                del self._snapshots[key]
+                continue
+            if key[1] in self._busy_types:
+                # Picked up again once that type's fan-out finishes and wakes us
+                continue
+            if snapshot['due_at'] <= now:
+                due.append(key)
+            elif next_due is None or snapshot['due_at'] < next_due:
+                next_due = snapshot['due_at']
+        return due, next_due
+
+    def _refresh(self, key):
+        return self._loader(*key)
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                if not self._running:
+                    return
+                due, next_due = self._due_keys(time.time())
+                if not due:
+                    timeout = self.IDLE_INTERVAL if next_due is None else max(next_due - time.time(), 0.5)
+                    self._wakeup.wait(timeout)
+                    continue
+                # Push due_at forward so page views don't keep re-signalling this batch
+                by_type = {}
+                for key in due:
+                    self._snapshots[key]['due_at'] = time.time() + self.HOT_INTERVAL
+                    by_type.setdefault(key[1], []).append(key)
+                self._busy_types.update(by_type)
+
+            for type, keys in by_type.items():
+                threading.Thread(
+                    target=self._refresh_type, args=(type, keys),
+                    name=f"scoreboard-refresh-{type}", daemon=True
+                ).start()
+
+    def _refresh_type(self, type, keys):
+        try:
+            for key, games in async_fanout.map_blocking(self._refresh, keys, timeout=self._timeouts.get(type)):
+                if isinstance(games, Exception):
+                    self.stats["refresh_errors"] += 1
+                    print(f"Scoreboard refresh failed for {key}: {games}")
+                    self._store_failure(key)
+                    continue
+                self._store(key, games)
+                self.stats["refreshes"] += 1
+        except Exception as e:
+            self.stats["refresh_errors"] += 1
+            print(f"Scoreboard refresher error: {e}")
+            for key in keys:
+                self._store_failure(key)
+        finally:
+            with self._wakeup:
+                self._busy_types.discard(type)
+                self._wakeup.notify_all()
+
+    def get_stats(self):
+        with self._lock:
+            now = time.time()
+            stats = dict(self.stats)
+            stats["snapshots"] = len(self._snapshots)
+            stats["hot"] = sum(1 for s in self._snapshots.values() if s['due_at'] - s['fetched_at'] <= self.HOT_INTERVAL)
+            stats["failing"] = sum(1 for s in self._snapshots.values() if s.get('failures'))
+            stats["oldest_snapshot_age"] = round(max((now - s['fetched_at'] for s in self._snapshots.values()), default=0), 1)
+            stats["running"] = self._thread is not None and self._running
+        return stats
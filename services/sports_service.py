@@ -1,7 +1,16 @@
 
-import requests
-from datetime import datetime, timedelta
+import os
 import concurrent.futures
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+from datetime import datetime, timedelta
+from services.cache_service import ResponseCache
+from services.scoreboard_refresher import ScoreboardRefresher
+from services.singleflight import SingleFlight
+from services.database_service import DatabaseService
+from services.game_models import Game, GameList, Team
+from services import http_client, async_fanout, json_stream
 
 class SportsService:
     # Configuration for supported leagues and their ESPN paths
@@ -22,44 +31,140 @@ class SportsService:
         'nba': {'sport': 'basketball', 'slug': 'nba', 'name': 'NBA'}
     }
 
-    def _fetch_from_url(self, url, params=None):
+    # Overridable so benchmarks can point the service at a local stand-in
+    ESPN_BASE_URL = os.getenv("ESPN_BASE_URL", "http://site.api.espn.com/apis/site/v2/sports").rstrip('/')
+
+    # History window served by /history, and how many recent days are always re-fetched
+    HISTORY_DAYS = 90
+    HISTORY_MUTABLE_DAYS = int(os.getenv("HISTORY_MUTABLE_DAYS", 3))
+    # Longest date range requested in one call when backfilling the archive
+    HISTORY_FETCH_DAYS = int(os.getenv("HISTORY_FETCH_DAYS", 15))
+    # Fan-out deadline for 'all' history pages; a cold archive backfill takes far longer than a scoreboard
+    HISTORY_FANOUT_TIMEOUT = float(os.getenv("HISTORY_FANOUT_TIMEOUT", 120))
+
+    # Shared by every SportsService instance in this process
+    _cache = ResponseCache()
+    # Small dedicated pool for archive backfills (these may run inside the fan-out pool)
+    _history_executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=int(os.getenv("HISTORY_BACKFILL_WORKERS", 4)), thread_name_prefix="history"
+    )
+    _default_db = None
+
+    # event id -> (league, date), mirrored to the event_index table in batches. Only the
+    # EVENT_INDEX_SIZE most recently used ids stay in memory, older ones are read back from the table
+    EVENT_INDEX_SIZE = int(os.getenv("EVENT_INDEX_SIZE", 50000))
+    _event_index = OrderedDict()
+    # Entries not yet written to the table, kept apart so eviction cannot drop them
+    _event_index_dirty = {}
+    _event_index_lock = threading.Lock()
+
+    def __init__(self, db_service=None):
+        self._db_service = db_service
+
+    @property
+    def db(self):
+        if self._db_service is None:
+            if SportsService._default_db is None:
+                SportsService._default_db = DatabaseService()
+            self._db_service = SportsService._default_db
+        return self._db_service
+
+    # Concurrent identical upstream requests share one in-flight fetch
+    _inflight = SingleFlight()
+
+    def _fetch_from_url(self, url, params=None, use_cache=True, raise_errors=False):
+        """
+        Cached, de-duplicated GET returning the JSON payload. Upstream errors give
+        {} unless raise_errors is set, for callers that must tell a failed fetch
+        apart from an empty one.
+        """
+        key = self._cache.make_key(url, params)
+        if use_cache:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()  
+            return self._inflight.do(key, lambda: self._fetch_uncached(url, params, key, use_cache))
         except Exception:
+            if raise_errors:
+                raise
             return {}
 
+    def _fetch_uncached(self, url, params, key, use_cache=True):
+        response = http_client.get(url, params=params)
+        response.raise_for_status()
+        data = response.json()
+
+        if use_cache:
+            self._cache.set(key, data, self._cache.ttl_for(data, params), size=len(response.content))
+        return data
+
+    # Background snapshot refresher, only set once enable_background_refresh() is called
+    _refresher = None
+
+    @classmethod
+    def enable_background_refresh(cls):
+        if cls._refresher is None:
+            cls._refresher = ScoreboardRefresher(
+                lambda league_code, type: cls()._load_league_games(league_code, type, None),
+                timeouts={'past': cls.HISTORY_FANOUT_TIMEOUT}
+            )
+            cls._refresher.start()
+        return cls._refresher
+
+    def get_refresher_stats(self):
+        if self._refresher is None:
+            return {"running": False}
+        return self._refresher.get_stats()
+
+    def get_cache_stats(self):
+        return self._cache.get_stats()
+
+    def get_http_stats(self):
+        return http_client.get_stats()
+
+    def get_singleflight_stats(self):
+        return self._inflight.get_stats()
+
+    def get_fanout_stats(self):
+        return async_fanout.get_stats()
+
     def _get_api_url(self, league_code):
         config = self.LEAGUES_CONFIG.get(league_code)
         if not config:
             return None
-        return f"http://site.api.espn.com/apis/site/v2/sports/{config['sport']}/{config['slug']}/scoreboard"
+        return f"{self.ESPN_BASE_URL}/{config['sport']}/{config['slug']}/scoreboard"
 
     def get_games(self, league_code='epl', type='upcoming', dates=None):
-        all_games = []
+        all_games = GameList()
         if league_code == 'all':
-             # Aggregate all leagues (expensive, but requested)
-             with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-                 # Submit all tasks
-                 future_to_code = {executor.submit(self._fetch_league_games, code, type, dates): code for code in self.LEAGUES_CONFIG.keys()}
-                 
-                 for future in concurrent.futures.as_completed(future_to_code):
-                     try:
-                         games = future.result()
-                         all_games.extend(games)
-                     except Exception as exc:
-                         print(f"League fetching generated an exception: {exc}")
+             # Aggregate all leagues on the shared asyncio fan-out (bounded, no per-request pool)
+             results = async_fanout.map_blocking(
+                 lambda code: self._fetch_league_games(code, type, dates),
+                 self.LEAGUES_CONFIG.keys(),
+                 timeout=self.HISTORY_FANOUT_TIMEOUT if type == "past" and not dates else None
+             )
+             for code, games in results:
+                 if isinstance(games, Exception):
+                     print(f"League fetching generated an exception: {games}")
+                     all_games.missing_leagues.append(code)
+                     continue
+                 all_games.extend(games)
         else:
-             all_games = self._fetch_league_games(league_code, type, dates)
+             try:
+                 all_games.extend(self._fetch_league_games(league_code, type, dates))
+             except Exception as e:
+                 print(f"League fetching failed for {league_code}: {e}")
+                 all_games.missing_leagues.append(league_code)
         
         # Sort by date
-        all_games.sort(key=lambda x: x['date'], reverse=(type == "past"))
+        all_games.sort(key=attrgetter('date'), reverse=(type == "past"))
 
         if type == "upcoming":
             # Split into Live and Upcoming
-            live_games = [g for g in all_games if g['status'] == 'in']
-            upcoming_games = [g for g in all_games if g['status'] == 'pre']
+            live_games = [g for g in all_games if g.status == 'in']
+            upcoming_games = [g for g in all_games if g.status == 'pre']
             
             # Sort upcoming by nearest time (already sorted by date above, but ensures asc)
             # live games also sorted by start time
@@ -68,7 +173,9 @@ class SportsService:
 
             return {
                 'live': live_games,
-                'upcoming': upcoming_games
+                'upcoming': upcoming_games,
+                # Leagues that failed or missed the fan-out deadline, so the page can say it is partial
+                'missing_leagues': all_games.missing_leagues
             }
         
         return all_games
@@ -88,24 +195,29 @@ class SportsService:
         pass 
 
     def _fetch_league_games(self, league_code, type, dates):
+        # Default windows are served from the warm background snapshot when enabled
+        if self._refresher is not None and not dates and league_code in self.LEAGUES_CONFIG:
+            return self._refresher.get(league_code, type)
+        return self._load_league_games(league_code, type, dates)
+
+    def _load_league_games(self, league_code, type, dates):
         url = self._get_api_url(league_code)
         if not url: return []
+
+        # Past games come from the incremental history store (last 90 days)
+        if type == "past" and not dates:
+            games = self._load_history(league_code)
+            self._flush_event_index()
+            return games
         
         all_events = []
         
         # If dates is provided, use it (single call)
-        # If type is 'past', fetch last 4 weeks
         # If type is 'upcoming', fetch next 2 weeks (current week + next week)
         request_dates = []
         
         if dates:
             request_dates = [dates]
-        elif type == "past":
-            # Fetch last 90 days using range to catch older pending predictions
-            today = datetime.now()
-            start = (today - timedelta(days=90)).strftime("%Y%m%d")
-            end = today.strftime("%Y%m%d")
-            request_dates = [f"{start}-{end}"]
         else: # upcoming
             # Fetch Current + Next 14 days using range
             today = datetime.now()
@@ -118,7 +230,8 @@ class SportsService:
             if date_param:
                 params['dates'] = date_param
             
-            data = self._fetch_from_url(url, params)
+            # A failed fetch raises rather than looking like a day without games
+            data = self._fetch_from_url(url, params, raise_errors=True)
             if not data: continue
 
             for event in data.get('events', []):
@@ -129,50 +242,210 @@ class SportsService:
         # Remove duplicates if any (based on id)
         unique_events = {e['id']: e for e in all_events}.values()
         games = list(unique_events)
-        
+
+        self._flush_event_index()
         return games
 
+    def _load_history(self, league_code):
+        """
+        Finished games barely change, so days older than HISTORY_MUTABLE_DAYS are
+        archived per league and per day in the DB. Only the recent window and any
+        missing archive days are fetched from ESPN; the rest is read locally.
+        """
+        url = self._get_api_url(league_code)
+        today = datetime.now()
+        window_start = today - timedelta(days=self.HISTORY_DAYS)
+        mutable_start = today - timedelta(days=self.HISTORY_MUTABLE_DAYS - 1)
+        archive_end = mutable_start - timedelta(days=1)
+
+        archive_days = []
+        day = window_start
+        while day <= archive_end:
+            archive_days.append(day.strftime("%Y%m%d"))
+            day += timedelta(days=1)
+
+        stored = self.db.get_history_chunks(league_code, archive_days[0], archive_days[-1]) if archive_days else {}
+        missing = [d for d in archive_days if d not in stored]
+
+        # Backfill missing archive days as contiguous ranges, in parallel
+        segments = []
+        for d in missing:
+            if segments and len(segments[-1]) < self.HISTORY_FETCH_DAYS and self._next_day(segments[-1][-1]) == d:
+                segments[-1].append(d)
+            else:
+                segments.append([d])
+        futures = [
+            self._history_executor.submit(self._fetch_history_segment, url, league_code, seg)
+            for seg in segments
+        ]
+
+        # Recent days can still change (live/late results), always fetch them; the response
+        # cache keeps a window reaching today for PRE_TTL at most, even if every game is final
+        recent_param = f"{mutable_start.strftime('%Y%m%d')}-{today.strftime('%Y%m%d')}"
+        recent = self._games_from_payload(
+            self._fetch_from_url(url, {'dates': recent_param}, raise_errors=True), league_code
+        )
+
+        fetched_chunks = {}
+        for future in futures:
+            try:
+                fetched_chunks.update(future.result())
+            except Exception as e:
+                print(f"History backfill failed for {league_code}: {e}")
+        if fetched_chunks:
+            self.db.save_history_chunks(
+                league_code, {day: [g.to_dict() for g in games] for day, games in fetched_chunks.items()}
+            )
+
+        merged = {}
+        for games in stored.values():
+            for g in games:
+                try:
+                    merged[g['id']] = Game.from_dict(g)
+                except (KeyError, AttributeError):
+                    continue # Malformed archived entry
+        for games in fetched_chunks.values():
+            for g in games:
+                merged[g.id] = g
+        for g in recent:
+            merged[g.id] = g
+        return list(merged.values())
+
+    def _fetch_history_segment(self, url, league_code, days):
+        """
+        Fetches a contiguous run of days in one range call and splits it into per-day chunks.
+        Raises on any fetch or parse error so a partial range is never archived; the
+        days stay missing and are retried next time.
+        """
+        params = {'dates': days[0] if len(days) == 1 else f"{days[0]}-{days[-1]}"}
+        # Concurrent backfills of the same range still share one download
+        key = ('history', self._cache.make_key(url, params))
+        return self._inflight.do(key, lambda: self._bucket_by_day(self._iter_games(url, params, league_code), days))
+
+    @staticmethod
+    def _bucket_by_day(games, days):
+        chunks = {d: [] for d in days}
+        for g in games:
+            # Bucket by UTC kickoff day, clamped into the requested range so edge games are not lost
+            day = g.date[:10].replace('-', '')
+            day = min(max(day, days[0]), days[-1])
+            chunks[day].append(g)
+        return chunks
+
+    def _iter_games(self, url, params, league_code):
+        """
+        Streams a scoreboard response and yields processed games while it downloads,
+        decoding one event at a time once the body passes json_stream.STREAM_MIN_BYTES,
+        so a long date range is never held as a whole parsed document. Bypasses the
+        response cache (the range is archived straight to the DB) and raises on HTTP
+        or parse errors instead of returning partial data.
+        """
+        with http_client.get(url, params=params, stream=True) as response:
+            response.raise_for_status()
+            for event in json_stream.iter_array(response.iter_content(json_stream.CHUNK_SIZE), 'events'):
+                game_info = self._process_event(event, league_code)
+                if game_info:
+                    yield game_info
+
+    @staticmethod
+    def _next_day(day):
+        return (datetime.strptime(day, "%Y%m%d") + timedelta(days=1)).strftime("%Y%m%d")
+
+    def _games_from_payload(self, data, league_code):
+        games = []
+        for event in (data or {}).get('events', []):
+            game_info = self._process_event(event, league_code)
+            if game_info:
+                games.append(game_info)
+        return games
+
+    def _index_event(self, event_id, league_code, date):
+        entry = (league_code, date)
+        with self._event_index_lock:
+            if self._event_index.get(event_id) != entry:
+                self._event_index_dirty[event_id] = entry
+            self._remember_event(event_id, entry)
+
+    def _remember_event(self, event_id, entry):
+        # Caller holds _event_index_lock
+        self._event_index[event_id] = entry
+        self._event_index.move_to_end(event_id)
+        while len(self._event_index) > self.EVENT_INDEX_SIZE:
+            self._event_index.popitem(last=False)
+
+    def _flush_event_index(self):
+        with self._event_index_lock:
+            if not self._event_index_dirty:
+                return
+            rows = [(eid,) + entry for eid, entry in self._event_index_dirty.items()]
+            self._event_index_dirty.clear()
+        self.db.save_event_index(rows)
+
+    def lookup_events(self, event_ids):
+        """Returns {event_id: (league, date)} from memory, falling back to the persistent index."""
+        found = {}
+        unknown = []
+        with self._event_index_lock:
+            for eid in event_ids:
+                eid = str(eid)
+                entry = self._event_index.get(eid) or self._event_index_dirty.get(eid)
+                if entry:
+                    found[eid] = entry
+                    self._remember_event(eid, entry)
+                else:
+                    unknown.append(eid)
+        if unknown:
+            stored = self.db.get_event_index(unknown)
+            with self._event_index_lock:
+                for eid, entry in stored.items():
+                    if eid not in self._event_index:
+                        self._remember_event(eid, entry)
+            found.update(stored)
+        return found
+
+    def resolve_league(self, event_id):
+        entry = self.lookup_events([event_id]).get(str(event_id))
+        return entry[0] if entry else None
+
     def _process_event(self, event, league_code):
         try:
             status_id = event['status']['type']['state']
             
-            competitors = event['competitions'][0]['competitors']
-            home = next((c for c in competitors if c['homeAway'] == 'home'), None)
-            away = next((c for c in competitors if c['homeAway'] == 'away'), None)
+            # One pass over the (two) competitors instead of a generator scan per side
+            home = away = None
+            for c in event['competitions'][0]['competitors']:
+                side = c['homeAway']
+                if side == 'home':
+                    home = home or c
+                elif side == 'away':
+                    away = away or c
             
             if not home or not away: return None
 
-            game_info = {
-                'id': event['id'],
-                'date': event['date'],
-                'status': status_id,
-                'status_detail': event['status']['type']['shortDetail'],
-                'home_team': {
-                    'name': home['team']['displayName'],
-                    'logo': home['team'].get('logo', ''),
-                    'score': home.get('score', '0'),
-                    'winner': home.get('winner', False)
-                },
-                'away_team': {
-                    'name': away['team']['displayName'],
-                    'logo': away['team'].get('logo', ''),
-                    'score': away.get('score', '0'),
-                    'winner': away.get('winner', False)
-                },
-                'league': league_code,
-                'league_name': self.LEAGUES_CONFIG[league_code]['name']
-            }
-            return game_info
+            # Slotted records with interned strings; they still support game['home_team']['name']
+            game_info = Game(
+                event['id'],
+                event['date'],
+                status_id,
+                event['status']['type']['shortDetail'],
+                Team(home['team']['displayName'], home['team'].get('logo', ''), home.get('score', '0'), home.get('winner', False)),
+                Team(away['team']['displayName'], away['team'].get('logo', ''), away.get('score', '0'), away.get('winner', False)),
+                league_code,
+                self.LEAGUES_CONFIG[league_code]['name']
+            )
+            self._index_event(game_info.id, league_code, game_info.date)
             return game_info
         except Exception:
             return None
 
-    def get_game_stats(self, event_id, league_code):
+    def get_game_stats(self, event_id, league_code=None):
+        if league_code not in self.LEAGUES_CONFIG:
+            league_code = self.resolve_league(event_id)
         url = self._get_api_url(league_code)
         if not url: return None
         
         config = self.LEAGUES_CONFIG.get(league_code)
-        summary_url = f"http://site.api.espn.com/apis/site/v2/sports/{config['sport']}/{config['slug']}/summary"
+        summary_url = f"{self.ESPN_BASE_URL}/{config['sport']}/{config['slug']}/summary"
         
         try:
             data = self._fetch_from_url(summary_url, params={'event': event_id})
@@ -232,6 +505,40 @@ class SportsService:
             print(f"Error stats: {e}")
             return None
 
+    def get_finished_games(self, league_code, dates):
+        """
+        Results for every event on a league scoreboard date range in one call.
+        Returns {event_id: result} shaped like get_finished_game(); raises if the
+        scoreboard could not be fetched, so a failure is not read as "no events".
+        """
+        url = self._get_api_url(league_code)
+        if not url: return {}
+
+        data = self._fetch_from_url(url, {'dates': dates}, raise_errors=True)
+        results = {}
+        for event in (data or {}).get('events', []):
+            try:
+                # Keep the event index warm as a side effect
+                self._process_event(event, league_code)
+                competition = event['competitions'][0]
+                status = event['status']['type']['state']
+                if status != 'post':
+                    results[str(event['id'])] = {'status': status}
+                    continue
+                competitors = competition['competitors']
+                home = next((c for c in competitors if c['homeAway'] == 'home'), {})
+                away = next((c for c in competitors if c['homeAway'] == 'away'), {})
+                results[str(event['id'])] = {
+                    'status': 'post',
+                    'home_score': int(home.get('score', 0)),
+                    'away_score': int(away.get('score', 0)),
+                    'winner': 'home' if home.get('winner') else ('away' if away.get('winner') else 'draw')
+                }
+            except Exception as e:
+                print(f"Error reading scoreboard result: {e}")
+        self._flush_event_index()
+        return results
+
     def get_finished_game(self, event_id, league_code):
         # We need to know the sport/league to construct the URL
         # We can try to infer or pass it. 
@@ -245,7 +552,7 @@ class SportsService:
         # http://site.api.espn.com/apis/site/v2/sports/{sport}/{league}/summary?event={id}
         
         config = self.LEAGUES_CONFIG.get(league_code)
-        summary_url = f"http://site.api.espn.com/apis/site/v2/sports/{config['sport']}/{config['slug']}/summary"
+        summary_url = f"{self.ESPN_BASE_URL}/{config['sport']}/{config['slug']}/summary"
         
         try:
             data = self._fetch_from_url(summary_url, params={'event': event_id})
@@ -283,7 +590,7 @@ class SportsService:
         # http://site.api.espn.com/apis/site/v2/sports/{sport}/{league}/summary?event={id}
         
         config = self.LEAGUES_CONFIG.get(league_code)
-        summary_url = f"http://site.api.espn.com/apis/site/v2/sports/{config['sport']}/{config['slug']}/summary"
+        summary_url = f"{self.ESPN_BASE_URL}/{config['sport']}/{config['slug']}/summary"
         
         try:
             data = self._fetch_from_url(summary_url, params={'event': event_id})